@@ -0,0 +1 @@
+"""Módulos de apoio ao aplicativo das Escolas Prioritárias (dados, mapas e cache)."""
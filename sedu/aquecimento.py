@@ -0,0 +1,79 @@
+"""Pré-carregamento das dependências pesadas, numa thread em segundo plano.
+
+O aplicativo importa pandas, folium, geopandas e plotly (e os módulos de dados que dependem
+deles) só nas seções que os usam, para que a Página Inicial apareça sem esperar por eles. Na
+primeira execução do aplicativo em cada processo, `aquecer_dependencias` agenda a importação
+desses módulos em segundo plano, logo depois da primeira página: quando o usuário abrir outra
+seção, eles já estarão carregados (ou terminando de carregar).
+
+A variável de ambiente SEDU_AQUECIMENTO=0 desliga o pré-carregamento.
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+
+# Módulos das seções, na ordem de uso mais comum: Critérios de Seleção, Gráficos e Mapas
+MODULOS_PESADOS = (
+    'pandas',
+    'sedu.armazem',
+    'sedu.reconciliacao',
+    'sedu.indices',
+    'sedu.priorizacao',
+    'sedu.busca',
+    'sedu.series',
+    'sedu.indicadores',
+    'plotly.graph_objects',
+    'sedu.graficos',
+    'folium',
+    'streamlit_folium',
+    'geopandas',
+    'sedu.camadas',
+    'sedu.componente_mapa',
+    'sedu.localizacao',
+    'sedu.municipios',
+    'sedu.tiles_vetoriais',
+    'sedu.mapa_base',
+)
+
+# Espera (segundos) antes de começar, para não disputar o processador com a primeira página
+ATRASO_AQUECIMENTO = 1.0
+
+AQUECIMENTO_ATIVO = os.environ.get('SEDU_AQUECIMENTO', '1') != '0'
+
+_log = logging.getLogger(__name__)
+_trava = threading.Lock()
+_thread = None
+_duracoes = {}
+
+
+def _importar(modulos):
+    for nome in modulos:
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(nome)
+        except Exception:
+            # Dependência ausente: a seção que a usa mostra o erro quando for aberta
+            _log.warning("Pré-carregamento de %s falhou", nome, exc_info=True)
+            continue
+        _duracoes[nome] = time.perf_counter() - inicio
+
+
+def aquecer_dependencias(modulos=MODULOS_PESADOS):
+    """Agenda (uma vez por processo) a importação dos módulos em segundo plano; retorna a thread"""
+    global _thread
+    if not AQUECIMENTO_ATIVO:
+        return None
+    with _trava:
+        if _thread is None:
+            _thread = threading.Timer(ATRASO_AQUECIMENTO, _importar, args=(tuple(modulos),))
+            _thread.name = 'aquecimento'
+            _thread.daemon = True
+            _thread.start()
+    return _thread
+
+
+def estatisticas_aquecimento():
+    """Tempo (segundos) de importação de cada módulo já pré-carregado"""
+    return dict(_duracoes)
@@ -0,0 +1,104 @@
+"""Armazém colunar: cada planilha CSV é convertida uma vez para Parquet tipado e todas as
+leituras do aplicativo são feitas a partir dessa cópia.
+
+A cópia é refeita somente quando o hash da planilha de origem muda.
+"""
+import pandas as pd
+
+from sedu.artefatos import PASTA_ARTEFATOS, RAIZ, artefato_atualizado, hash_arquivo, registrar_artefato
+from sedu.cache import cache_compartilhado
+from sedu.ingestao import ler_csv
+from sedu.localizacao import ler_localizacao_escolas
+
+PASTA_TABELAS = PASTA_ARTEFATOS / 'tabelas'
+
+# Tempo máximo (segundos) de uma tabela no cache compartilhado entre sessões
+TTL_TABELAS = 3600
+
+# Colunas com poucos valores distintos e muitas repetições, guardadas como categorias
+COLUNAS_CATEGORICAS = ['SRE', 'ESCOLA', 'MUNICÍPIO', 'MUNICIPIO', 'REGIONAL_SRE', 'EQUIPE_RESPONSAVEL']
+
+# Tabelas conhecidas: nome -> (planilha de origem, função de leitura tipada)
+FONTES = {
+    'escolas_prioritarias': (
+        RAIZ / 'planilhas' / 'Escolas_Prioritarias_LIMPO.csv',
+        lambda caminho: ler_csv(caminho),
+    ),
+    'metas_idebes': (
+        RAIZ / 'planilhas' / 'metas e idebes.csv',
+        lambda caminho: ler_csv(caminho, sep=';', decimal=','),
+    ),
+    'localizacao_escolas': (
+        RAIZ / 'mapa' / 'escolas_prioritárias.csv',
+        ler_localizacao_escolas,
+    ),
+    'regionais': (
+        RAIZ / 'mapa' / 'regionais_sedu.csv',
+        lambda caminho: ler_csv(caminho),
+    ),
+}
+
+
+def caminho_tabela(nome):
+    """Caminho do Parquet de uma tabela do armazém"""
+    return PASTA_TABELAS / f'{nome}.parquet'
+
+
+def _tipar_categorias(df):
+    """Converte as colunas de texto repetitivo para o tipo categórico"""
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+
+def atualizar_tabela(nome):
+    """Relê a planilha de origem e grava a cópia colunar tipada"""
+    origem, ler = FONTES[nome]
+    destino = caminho_tabela(nome)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    df = _tipar_categorias(ler(origem))
+    df.to_parquet(destino, index=False)
+    registrar_artefato(destino, [origem])
+    return destino
+
+
+def garantir_tabela(nome):
+    """Reconstrói a cópia colunar apenas se a planilha de origem tiver mudado"""
+    origem, _ = FONTES[nome]
+    destino = caminho_tabela(nome)
+    if not artefato_atualizado(destino, [origem]):
+        atualizar_tabela(nome)
+    return destino
+
+
+def ler_tabela(nome, colunas=None):
+    """Lê a tabela a partir da cópia colunar (mantida em dia com a planilha)"""
+    return pd.read_parquet(garantir_tabela(nome), columns=colunas)
+
+
+def versao_tabela(nome):
+    """Versão dos dados de uma tabela: hash da planilha de origem"""
+    origem, _ = FONTES[nome]
+    return hash_arquivo(origem)
+
+
+@cache_compartilhado(max_entradas=16, ttl=TTL_TABELAS)
+def _carregar_tabela(nome, versao):
+    return ler_tabela(nome)
+
+
+def carregar_tabela(nome):
+    """Tabela do cache compartilhado entre sessões; lida do disco uma vez por versão dos dados"""
+    return _carregar_tabela(nome, versao_tabela(nome))
+
+
+def atualizar_armazem():
+    """Garante que todas as tabelas do armazém estejam em dia com as planilhas"""
+    return {nome: garantir_tabela(nome) for nome in FONTES}
+
+
+if __name__ == '__main__':
+    for nome, caminho in atualizar_armazem().items():
+        print(f"{nome}: {caminho}")
@@ -0,0 +1,61 @@
+"""Controle dos artefatos derivados (arquivos gerados a partir das planilhas e do shapefile)."""
+import hashlib
+import json
+from pathlib import Path
+
+# --- Pastas do projeto ---
+RAIZ = Path(__file__).resolve().parent.parent
+PASTA_ARTEFATOS = RAIZ / 'dados_derivados'
+
+# Hashes já calculados, indexados por (caminho, mtime, tamanho)
+_hashes_calculados = {}
+
+
+def hash_arquivo(caminho):
+    """Calcula o SHA-256 do arquivo, reaproveitando o valor enquanto mtime e tamanho não mudarem"""
+    caminho = Path(caminho).resolve()
+    info = caminho.stat()
+    chave = (str(caminho), info.st_mtime_ns, info.st_size)
+
+    if chave not in _hashes_calculados:
+        sha = hashlib.sha256()
+        with open(caminho, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+                sha.update(bloco)
+        _hashes_calculados[chave] = sha.hexdigest()
+
+    return _hashes_calculados[chave]
+
+
+def _caminho_metadados(destino):
+    """Arquivo JSON que acompanha o artefato com os hashes das origens"""
+    destino = Path(destino)
+    return destino.with_name(destino.name + '.json')
+
+
+def _hashes_origens(origens):
+    return {Path(origem).name: hash_arquivo(origem) for origem in origens}
+
+
+def artefato_atualizado(destino, origens):
+    """Indica se o artefato existe e foi gerado a partir das versões atuais das origens"""
+    metadados = _caminho_metadados(destino)
+    if not Path(destino).exists() or not metadados.exists():
+        return False
+
+    try:
+        registrados = json.loads(metadados.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return False
+
+    try:
+        return registrados.get('origens') == _hashes_origens(origens)
+    except OSError:
+        # Origem ausente: o artefato não pode ser conferido (e refazê-lo mostrará o erro)
+        return False
+
+
+def registrar_artefato(destino, origens):
+    """Grava ao lado do artefato os hashes das origens usadas para gerá-lo"""
+    conteudo = {'origens': _hashes_origens(origens)}
+    _caminho_metadados(destino).write_text(json.dumps(conteudo, indent=2, ensure_ascii=False), encoding='utf-8')
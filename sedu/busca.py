@@ -0,0 +1,147 @@
+"""Busca de escolas por nome, município, SRE ou INEP, sem diferenciar acentos e maiúsculas.
+
+O índice é montado uma vez por versão dos dados e compartilhado entre as sessões:
+- vocabulário ordenado de palavras com a lista de escolas de cada palavra: cada palavra da
+  consulta vira um intervalo do vocabulário (busca por prefixo com `searchsorted`);
+- índice invertido de trigramas sobre o vocabulário: quando o prefixo não encontra o bastante,
+  cada palavra da consulta é aproximada das palavras mais parecidas (tolera erros de digitação);
+- INEPs como texto ordenado, para buscas por prefixo do código.
+"""
+import numpy as np
+import pandas as pd
+
+from sedu.cache import cache_compartilhado
+from sedu.normalizacao import normalizar_nome, normalizar_serie
+from sedu.reconciliacao import carregar_mestre, trigramas, versoes_mestre
+
+# Similaridade mínima (Dice sobre trigramas) para a busca aproximada
+LIMIAR_APROXIMADA = 0.6
+RESULTADOS_BUSCA = 10
+TTL_BUSCA = 3600
+
+
+def _texto_busca(texto):
+    """Texto normalizado só com letras, dígitos e espaços simples"""
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in normalizar_nome(texto)).split())
+
+
+class IndiceBusca:
+    """Índices de prefixo, trigramas e INEP sobre o catálogo de escolas"""
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo.reset_index(drop=True)
+        textos = (normalizar_serie(self.catalogo['ESCOLA']).fillna('') + ' '
+                  + normalizar_serie(self.catalogo['MUNICIPIO']).fillna('') + ' '
+                  + normalizar_serie(self.catalogo['SRE']).fillna(''))
+        palavras = (textos.str.replace(r'[^A-Z0-9 ]', ' ', regex=True)
+                    .str.split().explode().dropna())
+        pares = pd.DataFrame({'DOC': palavras.index.to_numpy(np.int64), 'PALAVRA': palavras.to_numpy(str)})
+        pares = pares.drop_duplicates()
+
+        # Postagens palavra -> escolas num único vetor, com as fronteiras de cada palavra
+        codigos, vocabulario = pd.factorize(pares['PALAVRA'], sort=True)
+        ordem = np.argsort(codigos, kind='stable')
+        self.vocabulario = np.asarray(vocabulario, dtype=object)
+        self._documentos = pares['DOC'].to_numpy()[ordem]
+        self._fronteiras = np.searchsorted(codigos[ordem], np.arange(len(self.vocabulario) + 1))
+
+        # Trigrama -> palavras do vocabulário, para a busca aproximada
+        por_trigrama = {}
+        self._tamanhos = np.empty(len(self.vocabulario), dtype=np.int64)
+        for posicao, palavra in enumerate(self.vocabulario):
+            grams = trigramas(palavra)
+            self._tamanhos[posicao] = len(grams)
+            for gram in grams:
+                por_trigrama.setdefault(gram, []).append(posicao)
+        self._trigramas = {gram: np.array(posicoes, dtype=np.int64) for gram, posicoes in por_trigrama.items()}
+
+        ineps = self.catalogo['INEP'].astype('Int64').astype(str).to_numpy()
+        self._ordem_inep = np.argsort(ineps, kind='stable')
+        self._ineps = ineps[self._ordem_inep].astype(object)
+
+    def _escolas_das_palavras(self, inicio, fim):
+        """Escolas de um intervalo do vocabulário"""
+        return np.unique(self._documentos[self._fronteiras[inicio]:self._fronteiras[fim]])
+
+    def _por_prefixo(self, palavra):
+        """Escolas com alguma palavra começando por `palavra`"""
+        inicio = np.searchsorted(self.vocabulario, palavra, side='left')
+        fim = np.searchsorted(self.vocabulario, palavra + '\uffff', side='left')
+        return self._escolas_das_palavras(inicio, fim)
+
+    def _por_inep(self, prefixo):
+        inicio = np.searchsorted(self._ineps, prefixo, side='left')
+        fim = np.searchsorted(self._ineps, prefixo + '\uffff', side='left')
+        return self._ordem_inep[inicio:fim]
+
+    def _aproximada(self, palavras, limiar):
+        """(escolas, relevância) pela média, entre as palavras da consulta, da similaridade
+        (Dice sobre trigramas) com a palavra mais parecida da escola"""
+        relevancia = np.zeros(len(self.catalogo))
+        for palavra in palavras:
+            grams = trigramas(palavra)
+            postagens = [self._trigramas[gram] for gram in grams if gram in self._trigramas]
+            if not postagens:
+                continue
+            comuns = np.bincount(np.concatenate(postagens), minlength=len(self.vocabulario))
+            candidatas = np.flatnonzero(comuns)
+            similaridade = 2 * comuns[candidatas] / (len(grams) + self._tamanhos[candidatas])
+            melhor = np.zeros(len(self.catalogo))
+            for posicao, valor in zip(candidatas[similaridade >= limiar], similaridade[similaridade >= limiar]):
+                escolas = self._documentos[self._fronteiras[posicao]:self._fronteiras[posicao + 1]]
+                melhor[escolas] = np.maximum(melhor[escolas], valor)
+            relevancia += melhor
+        relevancia /= len(palavras)
+        documentos = np.flatnonzero(relevancia >= limiar)
+        ordem = np.argsort(-relevancia[documentos], kind='stable')
+        return documentos[ordem], relevancia[documentos[ordem]]
+
+    def buscar(self, consulta, limite=RESULTADOS_BUSCA, limiar=LIMIAR_APROXIMADA):
+        """Escolas encontradas (colunas do catálogo + RELEVANCIA de 0 a 1), mais relevantes primeiro"""
+        texto = _texto_busca(consulta)
+        if not texto:
+            return self.catalogo.iloc[:0].assign(RELEVANCIA=[])
+
+        if texto.isdigit():
+            documentos = self._por_inep(texto)[:limite]
+            return self.catalogo.iloc[documentos].assign(RELEVANCIA=1.0)
+
+        # Todas as palavras da consulta como prefixo de alguma palavra da escola
+        palavras = texto.split()
+        encontrados = None
+        for palavra in palavras:
+            documentos = self._por_prefixo(palavra)
+            encontrados = documentos if encontrados is None else np.intersect1d(encontrados, documentos)
+            if len(encontrados) == 0:
+                break
+        encontrados = encontrados[:limite]
+        relevancia = [1.0] * len(encontrados)
+
+        # Completa com a busca aproximada (erros de digitação, acentos trocados etc.)
+        if len(encontrados) < limite:
+            aproximados, similaridade = self._aproximada(palavras, limiar)
+            novos = ~np.isin(aproximados, encontrados)
+            aproximados, similaridade = aproximados[novos][:limite - len(encontrados)], similaridade[novos]
+            encontrados = np.concatenate([encontrados, aproximados])
+            relevancia += similaridade[:len(aproximados)].tolist()
+
+        return self.catalogo.iloc[encontrados].assign(RELEVANCIA=relevancia)
+
+    def __len__(self):
+        return len(self.catalogo)
+
+
+@cache_compartilhado(max_entradas=2, ttl=TTL_BUSCA)
+def _carregar_indice_busca(versoes):
+    mestre, _ = carregar_mestre()
+    return IndiceBusca(mestre[['INEP', 'ESCOLA', 'SRE', 'MUNICIPIO']])
+
+
+def carregar_indice_busca():
+    """Índice de busca do catálogo de escolas, refeito quando alguma planilha com INEP mudar"""
+    return _carregar_indice_busca(versoes_mestre())
+
+
+def buscar_escolas(consulta, limite=RESULTADOS_BUSCA):
+    """Escolas que correspondem à consulta (nome, município, SRE ou INEP)"""
+    return carregar_indice_busca().buscar(consulta, limite)
@@ -0,0 +1,146 @@
+"""Caches em memória compartilhados entre as sessões do Streamlit.
+
+Os objetos deste módulo vivem enquanto o processo do servidor estiver ativo, então todas
+as sessões (e todas as reexecuções do script) enxergam os mesmos caches.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """Dicionário de tamanho limitado que descarta o item usado há mais tempo.
+
+    Com `ttl` (segundos), itens mais antigos que o prazo são descartados na leitura.
+    """
+
+    def __init__(self, max_entradas=8, ttl=None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self._travas_chaves = {}
+
+    def _buscar(self, chave):
+        """Busca sem contabilizar; precisa ser chamada com a trava adquirida"""
+        if chave not in self._itens:
+            return _AUSENTE
+        criado_em, valor = self._itens[chave]
+        if self.ttl is not None and time.monotonic() - criado_em > self.ttl:
+            del self._itens[chave]
+            return _AUSENTE
+        self._itens.move_to_end(chave)
+        return valor
+
+    def obter(self, chave, padrao=None):
+        """Retorna o valor da chave (marcando-a como usada recentemente) ou `padrao`"""
+        with self._trava:
+            valor = self._buscar(chave)
+            if valor is _AUSENTE:
+                self.falhas += 1
+                return padrao
+            self.acertos += 1
+            return valor
+
+    def guardar(self, chave, valor):
+        """Guarda o valor e remove os itens mais antigos além do limite"""
+        with self._trava:
+            self._itens[chave] = (time.monotonic(), valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_entradas:
+                self._itens.popitem(last=False)
+
+    def obter_ou_calcular(self, chave, calcular):
+        """Retorna o valor da chave ou o calcula. Sessões simultâneas pedindo a mesma chave
+        esperam um único cálculo. Resultados None não são guardados."""
+        with self._trava:
+            valor = self._buscar(chave)
+            if valor is not _AUSENTE:
+                self.acertos += 1
+                return valor
+            trava_chave = self._travas_chaves.setdefault(chave, threading.Lock())
+
+        with trava_chave:
+            # Outra sessão pode ter calculado enquanto esta esperava
+            with self._trava:
+                valor = self._buscar(chave)
+                if valor is not _AUSENTE:
+                    self.acertos += 1
+                else:
+                    self.falhas += 1
+            if valor is _AUSENTE:
+                valor = calcular()
+                if valor is not None:
+                    self.guardar(chave, valor)
+
+        with self._trava:
+            self._travas_chaves.pop(chave, None)
+        return valor
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        """Acertos, falhas e ocupação do cache"""
+        with self._trava:
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'itens': len(self._itens),
+                'max_entradas': self.max_entradas,
+                'ttl': self.ttl,
+            }
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
+
+
+# --- Registro de caches nomeados (sobrevive às reexecuções do script) ---
+_caches = {}
+_trava_registro = threading.Lock()
+
+
+def obter_cache(nome, max_entradas=8, ttl=None):
+    """Retorna o cache compartilhado com esse nome, criando-o na primeira chamada"""
+    with _trava_registro:
+        if nome not in _caches:
+            _caches[nome] = CacheLRU(max_entradas=max_entradas, ttl=ttl)
+        return _caches[nome]
+
+
+def estatisticas_caches():
+    """Estatísticas de todos os caches compartilhados, por nome"""
+    with _trava_registro:
+        caches = dict(_caches)
+    return {nome: cache.estatisticas() for nome, cache in caches.items()}
+
+
+def cache_compartilhado(max_entradas=8, ttl=None, versao=None):
+    """Decorador: guarda o resultado da função num cache compartilhado entre sessões.
+
+    A chave é formada pelos argumentos e, se informado, pelo retorno de `versao()`
+    (por exemplo, o hash das planilhas), de modo que uma nova versão dos dados
+    gera um novo cálculo. O valor devolvido é o mesmo objeto para todas as sessões
+    e não deve ser alterado por quem o recebe.
+    """
+    def decorador(funcao):
+        nome = f'{funcao.__module__}.{funcao.__qualname__}'
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            cache = obter_cache(nome, max_entradas=max_entradas, ttl=ttl)
+            chave = (args, tuple(sorted(kwargs.items())), versao() if versao else None)
+            return cache.obter_ou_calcular(chave, lambda: funcao(*args, **kwargs))
+
+        return envoltorio
+
+    return decorador
@@ -0,0 +1,127 @@
+"""Camadas do mapa folium que escalam para muitos elementos."""
+from folium.elements import JSCSSMixin
+from folium.map import Layer
+from folium.plugins import FastMarkerCluster
+from folium.raster_layers import TileLayer
+from folium.template import Template
+
+# Acima deste número de escolas os pontos são enviados como um único vetor agrupado
+LIMITE_MARCADORES_INDIVIDUAIS = 300
+
+# Colunas de cada linha do vetor enviado ao navegador (a ordem é usada no JavaScript abaixo)
+_COLUNAS_PONTOS = ['LATITUDE', 'LONGITUDE', 'COR', 'ESCOLA', 'SRE', 'EQUIPE_RESPONSAVEL', 'IDEBES_2024', 'INEP']
+
+# Cria cada ponto no navegador (círculo em canvas); o HTML do popup só é montado no clique
+_CALLBACK_PONTO = """
+function (linha) {
+    var marcador = L.circleMarker(new L.LatLng(linha[0], linha[1]), {
+        radius: 7, color: linha[2], fillColor: linha[2], fillOpacity: 0.85, weight: 1
+    });
+    marcador.bindTooltip(linha[3]);
+    marcador.bindPopup(function () {
+        return '<b>' + linha[3] + '</b><br>' +
+               '<b>SRE:</b> ' + linha[4] + '<br>' +
+               '<b>Equipe:</b> ' + linha[5] + '<br>' +
+               '<b>IDEBES 2024:</b> ' + linha[6] + '<br>' +
+               '<b>INEP:</b> ' + linha[7];
+    }, {maxWidth: 300});
+    return marcador;
+}
+"""
+
+
+def adicionar_escolas_agrupadas(mapa, escolas, cores_equipe):
+    """Adiciona as escolas como um único vetor compacto, com agrupamento e popups sob demanda"""
+    pontos = escolas.assign(COR=escolas['EQUIPE_RESPONSAVEL'].map(cores_equipe).fillna('gray'))
+    pontos = pontos[_COLUNAS_PONTOS]
+
+    # Textos sem valores ausentes para o JSON embutido no HTML
+    colunas_texto = _COLUNAS_PONTOS[2:]
+    pontos[colunas_texto] = pontos[colunas_texto].fillna('').astype(str)
+
+    FastMarkerCluster(
+        pontos.values.tolist(),
+        callback=_CALLBACK_PONTO,
+        name='Escolas',
+        options={'disableClusteringAtZoom': 13, 'chunkedLoading': True},
+    ).add_to(mapa)
+
+
+class CamadaMunicipiosVetoriais(JSCSSMixin, Layer):
+    """Municípios como tiles vetoriais (Leaflet.VectorGrid): o navegador busca só os tiles visíveis.
+
+    A cor de cada município vem da SRE (propriedade dos tiles, comparada em maiúsculas com
+    `cores_sre`) e o tooltip mostra "Município - SRE".
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var cores = {{ this.cores|tojson }};
+                var estilos = {};
+                estilos[{{ this.camada|tojson }}] = function (propriedades) {
+                    return {
+                        fill: true, fillColor: cores[(propriedades.SRE || '').toUpperCase()] || '#95a5a6',
+                        fillOpacity: 0.7, color: '#2c3e50', weight: 1.5
+                    };
+                };
+                var camada = L.vectorGrid.protobuf({{ this.url|tojson }}, {
+                    vectorTileLayerStyles: estilos,
+                    interactive: true,
+                    maxNativeZoom: {{ this.zoom_maximo_nativo }},
+                    rendererFactory: L.canvas.tile
+                });
+                var rotulo = L.tooltip({sticky: true, className: 'rotulo-municipio'});
+                camada.on('mouseover', function (e) {
+                    var p = e.layer.properties;
+                    rotulo.setLatLng(e.latlng)
+                          .setContent(p.NM_MUN + ' - ' + (p.SRE || 'SRE não identificada'))
+                          .addTo({{ this._parent.get_name() }});
+                });
+                camada.on('mouseout', function () { rotulo.remove(); });
+                return camada;
+            })();
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            var estilo_rotulo = document.createElement('style');
+            estilo_rotulo.textContent = '.rotulo-municipio {background-color: #2c3e50; color: white; ' +
+                'font-family: Arial; font-size: 12px; padding: 8px; border-radius: 4px; border: none;}';
+            document.head.appendChild(estilo_rotulo);
+        {% endmacro %}
+    """)
+
+    default_js = [
+        ('leaflet.vectorgrid',
+         'https://unpkg.com/leaflet.vectorgrid@1.3.0/dist/Leaflet.VectorGrid.bundled.min.js'),
+    ]
+
+    def __init__(self, url, camada, cores_sre, zoom_maximo_nativo, name='Municípios', **kwargs):
+        super().__init__(name=name, **kwargs)
+        self._name = 'CamadaMunicipiosVetoriais'
+        self.url = url
+        self.camada = camada
+        self.cores = cores_sre
+        self.zoom_maximo_nativo = zoom_maximo_nativo
+
+
+class MapaBaseLocal(TileLayer):
+    """Mapa base servido pelo cache local de tiles; os tiles que faltarem (ou se o servidor local
+    estiver fora do ar) são buscados na URL de reserva, tile a tile"""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.tileLayer(
+                {{ this.tiles|tojson }},
+                {{ this.options|tojavascript }}
+            );
+            {{ this.get_name() }}.on('tileerror', function (e) {
+                if (e.tile.dataset.reserva) { return; }
+                e.tile.dataset.reserva = '1';
+                e.tile.src = L.Util.template({{ this.url_reserva|tojson }}, e.coords);
+            });
+        {% endmacro %}
+    """)
+
+    def __init__(self, url, url_reserva, attr, **kwargs):
+        super().__init__(tiles=url, attr=attr, **kwargs)
+        self._name = 'MapaBaseLocal'
+        self.url_reserva = url_reserva
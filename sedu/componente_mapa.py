@@ -0,0 +1,96 @@
+"""Exibição de mapas folium já renderizados, sem refazer o HTML a cada execução do aplicativo.
+
+O `st_folium` renderiza o mapa inteiro (todas as camadas) a cada chamada, mesmo com
+`render=False`, e altera os identificadores do objeto. Aqui o mapa é renderizado uma única vez
+em `renderizar_mapa`, que devolve só os textos (HTML, cabeçalho e JavaScript) enviados ao
+componente do streamlit_folium; esse resultado é imutável e pode ficar no cache compartilhado
+entre as sessões. `exibir_mapa` apenas repassa os textos ao componente.
+
+Os textos e os argumentos do componente reproduzem funções internas do streamlit_folium, por isso
+a versão fica presa a 0.27.x em requirements.txt; tests/test_componente_mapa.py confere que eles
+continuam iguais aos do `st_folium`.
+"""
+from collections import namedtuple
+
+import branca
+import folium
+import folium.elements
+from streamlit_folium import _component_func, _get_header, _get_html, _get_map_string, generate_js_hash, get_full_id
+
+# Textos e valores iniciais enviados ao componente (o mesmo conteúdo que o st_folium gera)
+MapaRenderizado = namedtuple('MapaRenderizado',
+                             ['script', 'header', 'html', 'id', 'limites', 'zoom', 'css_links', 'js_links', 'chave'])
+
+# Interações que o componente pode retornar (valores iniciais None, exceto limites e zoom)
+_OBJETOS_RETORNADOS = ('last_clicked', 'last_object_clicked', 'last_object_clicked_count',
+                       'last_object_clicked_tooltip', 'last_object_clicked_popup', 'all_drawings',
+                       'last_active_drawing', 'bounds', 'zoom', 'last_circle_radius', 'last_circle_polygon',
+                       'selected_layers', 'selected_tags', 'last_geocoder_result')
+
+
+def _elementos_com_dependencias(elemento):
+    """Elementos do mapa que trazem arquivos CSS/JS (o d3 das escalas de cor é acrescentado à parte)"""
+    if isinstance(elemento, (branca.colormap.ColorMap, folium.elements.JSCSSMixin)):
+        yield elemento
+    for filho in getattr(elemento, '_children', {}).values():
+        yield from _elementos_com_dependencias(filho)
+
+
+def renderizar_mapa(mapa):
+    """Renderiza o mapa uma vez e retorna os textos do componente (o objeto é alterado e
+    não deve mais ser usado)"""
+    # Mesma sequência do st_folium (a página e depois o mapa), para gerar exatamente os mesmos textos
+    mapa.get_root().render()
+    mapa.render()
+    # HTML e cabeçalho antes do script: a geração do script altera a estrutura do mapa
+    html = _get_html(mapa)
+    header = _get_header(mapa)
+    script = _get_map_string(mapa)
+
+    css_links, js_links = [], []
+    for elemento in _elementos_com_dependencias(mapa):
+        if isinstance(elemento, branca.colormap.ColorMap):
+            js_links[:0] = ['https://d3js.org/d3.v4.min.js', 'https://cdnjs.cloudflare.com/ajax/libs/d3/3.5.5/d3.min.js']
+        css_links.extend(href for _, href in getattr(elemento, 'default_css', []))
+        js_links.extend(src for _, src in getattr(elemento, 'default_js', []))
+
+    southwest, northeast = mapa.get_bounds()
+    limites = {
+        '_southWest': {'lat': southwest[0], 'lng': southwest[1]},
+        '_northEast': {'lat': northeast[0], 'lng': northeast[1]},
+    }
+    return MapaRenderizado(
+        script=script, header=header, html=html, id=get_full_id(mapa), limites=limites,
+        zoom=mapa.options.get('zoom'),
+        css_links=tuple(dict.fromkeys(css_links)), js_links=tuple(dict.fromkeys(js_links)),
+        chave=generate_js_hash(script, None, False),
+    )
+
+
+def exibir_mapa(renderizado, largura=800, altura=600, zoom=None, centro=None, objetos_retornados=None):
+    """Exibe um mapa já renderizado; retorna as interações do usuário, como o st_folium"""
+    padroes = dict.fromkeys(_OBJETOS_RETORNADOS)
+    padroes.update(bounds=renderizado.limites, zoom=renderizado.zoom)
+    if objetos_retornados is not None:
+        padroes = {nome: valor for nome, valor in padroes.items() if nome in objetos_retornados}
+    return _component_func(
+        script=renderizado.script,
+        header=renderizado.header,
+        html=renderizado.html,
+        id=renderizado.id,
+        key=renderizado.chave,
+        height=altura,
+        width=largura,
+        returned_objects=objetos_retornados,
+        default=padroes,
+        zoom=zoom,
+        center=centro,
+        feature_group=None,
+        return_on_hover=False,
+        layer_control=None,
+        pixelated=False,
+        css_links=list(renderizado.css_links),
+        js_links=list(renderizado.js_links),
+        on_change=None,
+        wrap_longitude=False,
+    )
@@ -0,0 +1,158 @@
+"""Figuras Plotly das séries de metas e IDEBES.
+
+O modelo da figura (layout, estilo das linhas e rótulos) é montado uma única vez por processo.
+Cada sessão guarda a sua cópia e, ao trocar de escola, só os vetores x/y, os anos do eixo e o
+título são substituídos. Os vetores NumPy vão ao navegador como arrays tipados (base64) e, com
+o `orjson` 3.4 ou mais recente instalado, a serialização do Plotly usa esse motor (senão, o json
+da biblioteca padrão, com um aviso no log).
+"""
+import functools
+import logging
+
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+from sedu.cache import cache_compartilhado
+from sedu.historico import versao_historico
+from sedu.series import carregar_series
+
+# Opções do orjson usadas pelo Plotly ao serializar (disponíveis a partir do orjson 3.4)
+_OPCOES_ORJSON = ('OPT_NON_STR_KEYS', 'OPT_SERIALIZE_NUMPY')
+
+_log = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+if orjson is not None and all(hasattr(orjson, opcao) for opcao in _OPCOES_ORJSON):
+    pio.json.config.default_engine = 'orjson'
+else:
+    # No modo 'auto' o Plotly usaria qualquer orjson instalado, mesmo sem as opções de que precisa
+    pio.json.config.default_engine = 'json'
+    _log.info("Figuras serializadas com o json da biblioteca padrão: %s",
+              "orjson não instalado" if orjson is None
+              else f"orjson {getattr(orjson, '__version__', '?')} sem as opções usadas pelo Plotly")
+
+CONFIG_GRAFICO = {'displayModeBar': False, 'showlegend': True}
+
+# Grade da comparação entre escolas
+COLUNAS_COMPARACAO = 3
+ALTURA_LINHA_COMPARACAO = 230
+TTL_FIGURAS = 3600
+
+# Estilo de cada linha: nome -> (cor, posição do rótulo)
+ESTILO_LINHAS = {
+    'META': ('red', 'top center'),
+    'IDEBES': ('blue', 'bottom center'),
+}
+
+
+@functools.lru_cache(maxsize=1)
+def modelo_figura_serie():
+    """Figura-modelo sem dados; não deve ser alterada (use `nova_figura_serie`)"""
+    figura = go.Figure(layout=go.Layout(
+        # Sem o template padrão do Plotly (vários KB por gráfico); o tema vem do Streamlit
+        template=go.layout.Template(),
+        title=dict(x=0.5, xanchor='center', font=dict(size=20)),
+        xaxis=dict(title='', tickmode='array', gridcolor='lightgray', gridwidth=1),
+        yaxis=dict(title='Nota', range=[2.5, 6], gridcolor='lightgray', gridwidth=1, zeroline=False),
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        height=500,
+        plot_bgcolor='white',
+    ))
+    for nome, (cor, posicao) in ESTILO_LINHAS.items():
+        figura.add_trace(go.Scatter(
+            name=nome,
+            mode='lines+markers+text',
+            line=dict(color=cor, width=4),
+            marker=dict(size=12, color=cor),
+            # Rótulos formatados no navegador: não é preciso enviar um vetor de textos
+            texttemplate='%{y:.2f}',
+            textposition=posicao,
+            textfont=dict(size=12, color=cor),
+        ))
+    return figura
+
+
+def nova_figura_serie():
+    """Cópia independente da figura-modelo"""
+    return go.Figure(modelo_figura_serie())
+
+
+def preencher_figura_serie(figura, serie, titulo=None):
+    """Substitui na figura apenas os dados, os anos do eixo e o título da escola"""
+    anos = serie.anos
+    with figura.batch_update():
+        figura.data[0].update(x=anos, y=serie.meta)
+        figura.data[1].update(x=anos, y=serie.idebes)
+        figura.layout.xaxis.update(tickvals=anos, ticktext=[str(ano) for ano in anos])
+        figura.layout.title.text = titulo or f'{serie.escola}<br><sup>{serie.sre}</sup>'
+    return figura
+
+
+def figura_serie(estado, serie):
+    """Figura da escola guardada no estado da sessão; reaproveitada enquanto a série for a
+    mesma e apenas atualizada quando a escola (ou a versão dos dados) mudar"""
+    figura = estado.get('figura_serie')
+    if figura is None:
+        figura = nova_figura_serie()
+        estado['figura_serie'] = figura
+    if estado.get('figura_serie_origem') is not serie:
+        preencher_figura_serie(figura, serie)
+        estado['figura_serie_origem'] = serie
+    return figura
+
+
+def figura_comparacao(series, sre=None, colunas=COLUNAS_COMPARACAO):
+    """Grade de pequenos gráficos META x IDEBES, um por escola da SRE (ou de todas), montada
+    numa única figura a partir da matriz escola x ano"""
+    ineps, metas, idebes = series.matriz(sre)
+    anos = series.anos
+    linhas = max(1, -(-len(ineps) // colunas))
+    titulos = [series.rotulo(codigo) for codigo in ineps]
+
+    figura = make_subplots(
+        rows=linhas, cols=colunas, subplot_titles=titulos,
+        shared_yaxes=True, vertical_spacing=min(0.3 / linhas, 0.08), horizontal_spacing=0.04,
+    )
+    tracos, linhas_tracos, colunas_tracos = [], [], []
+    for posicao in range(len(ineps)):
+        linha, coluna = divmod(posicao, colunas)
+        for nome, valores in (('META', metas[posicao]), ('IDEBES', idebes[posicao])):
+            cor, _ = ESTILO_LINHAS[nome]
+            tracos.append(go.Scatter(
+                x=anos, y=valores, name=nome, legendgroup=nome, showlegend=posicao == 0,
+                mode='lines+markers', line=dict(color=cor, width=2), marker=dict(size=6, color=cor),
+                hovertemplate=f'{nome} %{{x}}: %{{y:.2f}}<extra></extra>',
+            ))
+            linhas_tracos.append(linha + 1)
+            colunas_tracos.append(coluna + 1)
+    # Todos os traços de uma vez: uma única validação e atualização da figura
+    figura.add_traces(tracos, rows=linhas_tracos, cols=colunas_tracos)
+
+    figura.update_xaxes(tickmode='array', tickvals=anos, ticktext=[str(ano) for ano in anos],
+                        gridcolor='lightgray')
+    figura.update_yaxes(range=[2.5, 6], gridcolor='lightgray', zeroline=False)
+    figura.update_annotations(font_size=11)
+    figura.update_layout(
+        template=go.layout.Template(),
+        height=ALTURA_LINHA_COMPARACAO * linhas + 80,
+        legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="right", x=1, yref='container'),
+        margin=dict(t=80, l=40, r=20, b=30),
+        plot_bgcolor='white',
+    )
+    return figura
+
+
+@cache_compartilhado(max_entradas=16, ttl=TTL_FIGURAS)
+def _carregar_figura_comparacao(sre, versao):
+    return figura_comparacao(carregar_series(), sre)
+
+
+def carregar_figura_comparacao(sre=None):
+    """Grade de comparação em cache compartilhado entre sessões, por SRE e versão dos dados.
+    A figura é a mesma para todas as sessões e não deve ser alterada"""
+    return _carregar_figura_comparacao(sre, versao_historico())
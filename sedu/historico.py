@@ -0,0 +1,367 @@
+"""Histórico de META e IDEBES particionado por ano, só com acréscimos.
+
+Cada ano fica num Parquet próprio (dados_derivados/idebes/ano=AAAA.parquet), com os
+indicadores de atingimento do ano ao lado (indicadores_ano=AAAA.parquet) e os agregados por
+escola (agregados.parquet) somados a cada ano incluído. A planilha de metas do repositório
+semeia o histórico; cada nova divulgação do IDEBES é validada e entra como uma nova partição:
+
+    python -m sedu.historico                              # semeia/atualiza a partir da planilha
+    python -m sedu.historico "idebes 2025.csv"            # inclui um novo ano
+    python -m sedu.historico "idebes 2025.csv" --substituir
+
+Incluir um ano lê só a nova planilha e as partições da janela de histórico; os indicadores são
+calculados apenas para esse ano (e para os anos seguintes da janela, se já existirem) e os
+agregados recebem só a contribuição do ano.
+
+O catálogo é a fonte da verdade: só as partições listadas nele são lidas. Tudo é calculado antes
+de gravar, e o catálogo é gravado por último, de modo que uma inclusão que falhe no meio não deixa
+um ano fora do catálogo sendo usado nos cálculos dos outros anos.
+"""
+import argparse
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sedu.armazem import FONTES, ler_tabela
+from sedu.artefatos import PASTA_ARTEFATOS, artefato_atualizado, hash_arquivo, registrar_artefato
+from sedu.ingestao import ler_csv
+
+PASTA_HISTORICO = PASTA_ARTEFATOS / 'idebes'
+ARQUIVO_CATALOGO = PASTA_HISTORICO / 'catalogo.json'
+ARQUIVO_AGREGADOS = PASTA_HISTORICO / 'agregados.parquet'
+PLANILHA_BASE = FONTES['metas_idebes'][0]
+
+# Anos considerados no "Histórico de atingimento de metas" (o ano e os dois anteriores)
+JANELA_HISTORICO = 3
+
+COLUNAS_HISTORICO = ['SRE', 'MUNICÍPIO', 'INEP', 'ESCOLA', 'ANO', 'META', 'IDEBES']
+COLUNAS_INDICADORES = ['INEP', 'ESCOLA', 'SRE', 'ANO', 'META', 'IDEBES', 'ATINGIU',
+                       'DESAFIO_CRESCIMENTO', 'ATINGIMENTOS_3_ANOS', 'AVALIADOS_3_ANOS']
+
+# Faixa válida das notas (META e IDEBES)
+_NOTA_VALIDA = (0.0, 10.0)
+
+# Reentrante: incluir_divulgacao chama garantir_historico já com a trava
+_trava = threading.RLock()
+
+
+def caminho_particao(ano):
+    """Parquet com as linhas de um ano"""
+    return PASTA_HISTORICO / f'ano={ano}.parquet'
+
+
+def caminho_indicadores_ano(ano):
+    """Parquet com os indicadores de um ano"""
+    return PASTA_HISTORICO / f'indicadores_ano={ano}.parquet'
+
+
+def ler_catalogo():
+    """Catálogo das partições: ano -> origem, hash da origem, linhas e data de inclusão"""
+    try:
+        return json.loads(ARQUIVO_CATALOGO.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {'particoes': {}}
+
+
+def _gravar_catalogo(catalogo):
+    temporario = ARQUIVO_CATALOGO.with_name(ARQUIVO_CATALOGO.name + '.tmp')
+    temporario.write_text(json.dumps(catalogo, indent=2, ensure_ascii=False), encoding='utf-8')
+    temporario.replace(ARQUIVO_CATALOGO)
+
+
+def anos_disponiveis():
+    """Anos com partição no histórico, em ordem"""
+    return sorted(int(ano) for ano in ler_catalogo()['particoes'])
+
+
+def validar_divulgacao(df):
+    """Confere uma planilha de divulgação e retorna suas linhas padronizadas (um único ano).
+    Levanta ValueError com a lista de problemas encontrados"""
+    faltantes = [coluna for coluna in ['INEP', 'ESCOLA', 'SRE', 'ANO', 'META', 'IDEBES'] if coluna not in df.columns]
+    if faltantes:
+        raise ValueError(f"Colunas ausentes: {', '.join(faltantes)}")
+
+    linhas = pd.DataFrame({
+        'SRE': df['SRE'].astype('string').str.strip(),
+        'MUNICÍPIO': (df['MUNICÍPIO'] if 'MUNICÍPIO' in df.columns else pd.Series(pd.NA, index=df.index))
+        .astype('string').str.strip(),
+        'INEP': pd.to_numeric(df['INEP'], errors='coerce').astype('Int64'),
+        'ESCOLA': df['ESCOLA'].astype('string').str.strip(),
+        'ANO': pd.to_numeric(df['ANO'], errors='coerce').astype('Int64'),
+        'META': pd.to_numeric(df['META'], errors='coerce').astype('float64'),
+        'IDEBES': pd.to_numeric(df['IDEBES'], errors='coerce').astype('float64'),
+    })
+
+    problemas = []
+    if linhas['INEP'].isna().any():
+        problemas.append(f"{linhas['INEP'].isna().sum()} linha(s) sem INEP válido")
+    anos = linhas['ANO'].dropna().unique()
+    if linhas['ANO'].isna().any() or len(anos) != 1:
+        problemas.append(f"a planilha deve ter um único ano (encontrados: {sorted(int(ano) for ano in anos)})")
+    repetidos = linhas['INEP'].dropna().duplicated()
+    if repetidos.any():
+        problemas.append(f"{repetidos.sum()} INEP(s) repetido(s)")
+    for coluna in ('META', 'IDEBES'):
+        fora = linhas[coluna].notna() & ~linhas[coluna].between(*_NOTA_VALIDA)
+        if fora.any():
+            problemas.append(f"{fora.sum()} valor(es) de {coluna} fora de {_NOTA_VALIDA}")
+    if linhas['META'].isna().all() and linhas['IDEBES'].isna().all():
+        problemas.append("nenhuma META ou IDEBES informada")
+    if problemas:
+        raise ValueError("Planilha inválida: " + '; '.join(problemas))
+
+    # Linhas sem META nem IDEBES não entram no histórico
+    return linhas[linhas['META'].notna() | linhas['IDEBES'].notna()].reset_index(drop=True)
+
+
+def _ler_particoes(anos, catalogo, novas=None):
+    """Partições do catálogo entre os anos informados: ano -> DataFrame. `novas` (ano -> linhas)
+    são as partições ainda não gravadas, que têm precedência sobre as do disco"""
+    novas = novas or {}
+    return {ano: novas[ano] if ano in novas else pd.read_parquet(caminho_particao(ano))
+            for ano in anos if ano in novas or str(ano) in catalogo['particoes']}
+
+
+def calcular_indicadores_ano(particoes, ano, janela=JANELA_HISTORICO):
+    """Indicadores das escolas de um ano a partir das partições do ano e dos `janela - 1` anteriores:
+    - ATINGIU: IDEBES do ano maior ou igual à META do ano;
+    - DESAFIO_CRESCIMENTO: META do ano menos o IDEBES do ano anterior;
+    - ATINGIMENTOS_3_ANOS / AVALIADOS_3_ANOS: metas atingidas e anos com META e IDEBES na janela
+    """
+    atual = particoes[ano]
+    avaliado = atual['META'].notna() & atual['IDEBES'].notna()
+    indicadores = pd.DataFrame({
+        'INEP': atual['INEP'].to_numpy(np.int64),
+        'ESCOLA': atual['ESCOLA'],
+        'SRE': atual['SRE'],
+        'ANO': np.int64(ano),
+        'META': atual['META'],
+        'IDEBES': atual['IDEBES'],
+        'ATINGIU': (avaliado & (atual['IDEBES'] >= atual['META'])).to_numpy(bool),
+    })
+
+    anterior = particoes.get(ano - 1)
+    idebes_anterior = (anterior.set_index('INEP')['IDEBES'] if anterior is not None
+                       else pd.Series(dtype='float64'))
+    indicadores['DESAFIO_CRESCIMENTO'] = (atual['META']
+                                          - atual['INEP'].map(idebes_anterior).astype('float64')).to_numpy()
+
+    na_janela = pd.concat([particoes[outro][['INEP', 'META', 'IDEBES']]
+                           for outro in range(ano - janela + 1, ano + 1) if outro in particoes])
+    janela_avaliado = na_janela['META'].notna() & na_janela['IDEBES'].notna()
+    contagens = pd.DataFrame({
+        'INEP': na_janela['INEP'],
+        'ATINGIU': (janela_avaliado & (na_janela['IDEBES'] >= na_janela['META'])).astype(np.int64),
+        'AVALIADO': janela_avaliado.astype(np.int64),
+    }).groupby('INEP').sum()
+    indicadores['ATINGIMENTOS_3_ANOS'] = atual['INEP'].map(contagens['ATINGIU']).fillna(0).to_numpy(np.int64)
+    indicadores['AVALIADOS_3_ANOS'] = atual['INEP'].map(contagens['AVALIADO']).fillna(0).to_numpy(np.int64)
+    return indicadores
+
+
+def _contribuicao(indicadores):
+    """Parcela de um ano nos agregados por escola (somas e contagens, indexadas por INEP)"""
+    avaliado = indicadores['META'].notna() & indicadores['IDEBES'].notna()
+    return pd.DataFrame({
+        'N_META': indicadores['META'].notna().astype(np.int64),
+        'SOMA_META': indicadores['META'].fillna(0.0),
+        'N_IDEBES': indicadores['IDEBES'].notna().astype(np.int64),
+        'SOMA_IDEBES': indicadores['IDEBES'].fillna(0.0),
+        'ANOS_AVALIADOS': avaliado.astype(np.int64),
+        'METAS_ATINGIDAS': indicadores['ATINGIU'].astype(np.int64),
+    }).set_index(indicadores['INEP'].rename('INEP'))
+
+
+def _agregados_vazios():
+    return _contribuicao(pd.DataFrame(columns=COLUNAS_INDICADORES)).assign(ULTIMO_ANO=pd.Series(dtype=np.int64))
+
+
+def _ler_agregados():
+    if ARQUIVO_AGREGADOS.exists():
+        return pd.read_parquet(ARQUIVO_AGREGADOS).set_index('INEP')
+    return _agregados_vazios()
+
+
+def _atualizar_agregados(agregados, nova, antiga=None):
+    """Soma a contribuição de um ano aos agregados (tirando a versão anterior do ano, se houver)"""
+    somas = agregados.drop(columns='ULTIMO_ANO').add(_contribuicao(nova), fill_value=0)
+    if antiga is not None:
+        somas = somas.sub(_contribuicao(antiga), fill_value=0)
+    somas = somas.astype({coluna: np.int64 for coluna in somas.columns if not coluna.startswith('SOMA_')})
+
+    ultimo_ano = agregados['ULTIMO_ANO'].reindex(somas.index)
+    if len(nova):
+        ano = int(nova['ANO'].iloc[0])
+        com_dados = ultimo_ano.index.isin(nova['INEP'])
+        ultimo_ano = ultimo_ano.where(~com_dados | (ultimo_ano >= ano), ano)
+    return somas.assign(ULTIMO_ANO=ultimo_ano.astype(np.int64))
+
+
+def _registrar_particao(catalogo, ano, origem, linhas):
+    """Registra a partição de um ano no catálogo (em memória; gravado em `_publicar`)"""
+    catalogo['particoes'][str(ano)] = {
+        'origem': Path(origem).name,
+        'hash': hash_arquivo(origem),
+        'linhas': len(linhas),
+        'incluida_em': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def _recalcular_indicadores(catalogo, anos, agregados, antigos_por_ano=None, novas=None):
+    """Refaz os indicadores dos anos informados e aplica a diferença aos agregados, sem gravar;
+    retorna (ano -> indicadores, agregados)"""
+    antigos_por_ano = antigos_por_ano or {}
+    particoes = _ler_particoes(range(min(anos) - JANELA_HISTORICO + 1, max(anos) + 1), catalogo, novas)
+    indicadores = {}
+    for ano in sorted(anos):
+        indicadores[ano] = calcular_indicadores_ano(particoes, ano)
+        agregados = _atualizar_agregados(agregados, indicadores[ano], antigos_por_ano.get(ano))
+    return indicadores, agregados
+
+
+def _publicar(catalogo, novas, indicadores, agregados):
+    """Grava as partições novas, os indicadores, os agregados e o catálogo: primeiro todos em
+    arquivos temporários e só então os troca pelos definitivos, o catálogo por último"""
+    PASTA_HISTORICO.mkdir(parents=True, exist_ok=True)
+    arquivos = [(linhas[COLUNAS_HISTORICO], caminho_particao(ano)) for ano, linhas in novas.items()]
+    arquivos += [(indicadores_ano, caminho_indicadores_ano(ano)) for ano, indicadores_ano in indicadores.items()]
+    arquivos.append((agregados.reset_index(), ARQUIVO_AGREGADOS))
+
+    temporarios = []
+    try:
+        for df, destino in arquivos:
+            temporario = destino.with_name(destino.name + '.tmp')
+            temporarios.append(temporario)
+            df.to_parquet(temporario, index=False)
+    except Exception:
+        for temporario in temporarios:
+            temporario.unlink(missing_ok=True)
+        raise
+    for temporario, (_, destino) in zip(temporarios, arquivos):
+        temporario.replace(destino)
+    _gravar_catalogo(catalogo)
+
+
+def incluir_divulgacao(caminho, substituir=False):
+    """Valida uma planilha de divulgação (um ano) e a inclui como nova partição; retorna o ano.
+    Um ano já presente só é trocado com `substituir=True`"""
+    linhas = validar_divulgacao(ler_csv(caminho, sep=';', decimal=','))
+    ano = int(linhas['ANO'].iloc[0])
+    with _trava:
+        garantir_historico()
+        catalogo = ler_catalogo()
+        if str(ano) in catalogo['particoes'] and not substituir:
+            raise ValueError(f"O ano {ano} já está no histórico (origem: {catalogo['particoes'][str(ano)]['origem']})")
+
+        # Indicadores do ano e dos anos seguintes da janela que já existirem (divulgação fora de ordem)
+        presentes = {int(outro) for outro in catalogo['particoes']} | {ano}
+        afetados = [seguinte for seguinte in range(ano, ano + JANELA_HISTORICO) if seguinte in presentes]
+        antigos = {outro: pd.read_parquet(caminho_indicadores_ano(outro)) for outro in afetados
+                   if str(outro) in catalogo['particoes'] and caminho_indicadores_ano(outro).exists()}
+
+        _registrar_particao(catalogo, ano, caminho, linhas)
+        novas = {ano: linhas}
+        indicadores, agregados = _recalcular_indicadores(catalogo, afetados, _ler_agregados(), antigos, novas)
+        _publicar(catalogo, novas, indicadores, agregados)
+    return ano
+
+
+def validar_por_ano(df):
+    """Valida uma planilha com vários anos e a separa por ano: ano -> linhas"""
+    return {int(ano): validar_divulgacao(linhas) for ano, linhas in df.groupby('ANO', sort=True)}
+
+
+def _semear_da_planilha_base():
+    """Refaz as partições vindas da planilha do repositório (anos de divulgações avulsas são
+    mantidos) e, como a mudança pode atingir qualquer ano, todos os indicadores e agregados"""
+    catalogo = ler_catalogo()
+    for ano, particao in list(catalogo['particoes'].items()):
+        if particao['origem'] == PLANILHA_BASE.name:
+            del catalogo['particoes'][ano]
+    novas = {}
+    for ano, linhas in validar_por_ano(ler_tabela('metas_idebes')).items():
+        if str(ano) not in catalogo['particoes']:
+            _registrar_particao(catalogo, ano, PLANILHA_BASE, linhas)
+            novas[ano] = linhas
+
+    anos = [int(ano) for ano in catalogo['particoes']]
+    indicadores, agregados = (_recalcular_indicadores(catalogo, anos, _agregados_vazios(), novas=novas) if anos
+                              else ({}, _agregados_vazios()))
+    _publicar(catalogo, novas, indicadores, agregados)
+
+    # Arquivos de anos que saíram do catálogo
+    for caminho in [*PASTA_HISTORICO.glob('ano=*.parquet'), *PASTA_HISTORICO.glob('indicadores_ano=*.parquet')]:
+        if caminho.stem.split('=')[1] not in catalogo['particoes']:
+            caminho.unlink()
+    registrar_artefato(ARQUIVO_CATALOGO, [PLANILHA_BASE])
+
+
+def semear_historico():
+    """Refaz o histórico a partir da planilha de metas, mantendo os anos incluídos à parte"""
+    with _trava:
+        _semear_da_planilha_base()
+    return ARQUIVO_CATALOGO
+
+
+def garantir_historico():
+    """Semeia o histórico a partir da planilha de metas quando ela mudar; retorna o catálogo"""
+    if not artefato_atualizado(ARQUIVO_CATALOGO, [PLANILHA_BASE]):
+        with _trava:
+            if not artefato_atualizado(ARQUIVO_CATALOGO, [PLANILHA_BASE]):
+                _semear_da_planilha_base()
+    return ARQUIVO_CATALOGO
+
+
+def versao_historico():
+    """Versão dos dados do histórico: muda a cada ano incluído ou planilha base alterada"""
+    return hash_arquivo(garantir_historico())
+
+
+def ler_historico():
+    """Todas as linhas do histórico (SRE, MUNICÍPIO, INEP, ESCOLA, ANO, META, IDEBES)"""
+    garantir_historico()
+    particoes = [pd.read_parquet(caminho_particao(ano)) for ano in anos_disponiveis()]
+    if not particoes:
+        return pd.DataFrame(columns=COLUNAS_HISTORICO)
+    return pd.concat(particoes, ignore_index=True)
+
+
+def ler_indicadores_historico():
+    """Indicadores de todos os anos, uma linha por INEP e ANO"""
+    garantir_historico()
+    partes = [pd.read_parquet(caminho_indicadores_ano(ano)) for ano in anos_disponiveis()]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_INDICADORES)
+    return pd.concat(partes, ignore_index=True)
+
+
+def ler_agregados():
+    """Agregados por escola em todo o histórico: somas e contagens de META e IDEBES, anos
+    avaliados, metas atingidas e último ano com dados"""
+    garantir_historico()
+    agregados = _ler_agregados().reset_index()
+    agregados['MEDIA_META'] = agregados['SOMA_META'] / agregados['N_META'].replace(0, np.nan)
+    agregados['MEDIA_IDEBES'] = agregados['SOMA_IDEBES'] / agregados['N_IDEBES'].replace(0, np.nan)
+    return agregados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Histórico de META e IDEBES particionado por ano.')
+    parser.add_argument('planilha', nargs='?', help='planilha de divulgação de um ano (CSV com ;)')
+    parser.add_argument('--substituir', action='store_true', help='troca o ano se ele já estiver no histórico')
+    argumentos = parser.parse_args()
+
+    if argumentos.planilha:
+        try:
+            ano = incluir_divulgacao(argumentos.planilha, argumentos.substituir)
+        except ValueError as erro:
+            parser.error(str(erro))
+        print(f"{ano} incluído: {caminho_particao(ano)}")
+    else:
+        garantir_historico()
+    for ano, particao in sorted(ler_catalogo()['particoes'].items()):
+        print(f"{ano}: {particao['linhas']} linhas ({particao['origem']}, {particao['incluida_em']})")
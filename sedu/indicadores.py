@@ -0,0 +1,50 @@
+"""Indicadores de atingimento de metas de todas as escolas, lidos do histórico particionado.
+
+Os indicadores são calculados ano a ano quando cada ano entra no histórico (`sedu.historico`):
+- ATINGIU: IDEBES do ano maior ou igual à META do ano;
+- DESAFIO_CRESCIMENTO: META do ano menos o IDEBES do ano anterior (critério "Desafio de crescimento");
+- ATINGIMENTOS_3_ANOS / AVALIADOS_3_ANOS: metas atingidas e anos com META e IDEBES na janela
+  dos últimos três anos (critério "Histórico de atingimento de metas").
+"""
+from sedu.cache import cache_compartilhado
+from sedu.historico import ler_agregados, ler_indicadores_historico, versao_historico
+
+TTL_INDICADORES = 3600
+
+
+def resumo_ano(indicadores, ano=None):
+    """Uma linha por escola com os indicadores de um ano (por padrão, o último com META)"""
+    if ano is None:
+        ano = indicadores.loc[indicadores['META'].notna(), 'ANO'].max()
+    return indicadores[indicadores['ANO'] == ano].reset_index(drop=True)
+
+
+@cache_compartilhado(max_entradas=2, ttl=TTL_INDICADORES)
+def _carregar_indicadores(versao):
+    return ler_indicadores_historico()
+
+
+def carregar_indicadores():
+    """Indicadores de todas as escolas, relidos só quando um ano entrar no histórico.
+    A tabela é a mesma para todas as sessões e não deve ser alterada"""
+    return _carregar_indicadores(versao_historico())
+
+
+@cache_compartilhado(max_entradas=2, ttl=TTL_INDICADORES)
+def _carregar_agregados(versao):
+    return ler_agregados().set_index('INEP')
+
+
+def carregar_agregados():
+    """Agregados por escola em todo o histórico (médias, anos avaliados, metas atingidas),
+    indexados por INEP. A tabela é a mesma para todas as sessões e não deve ser alterada"""
+    return _carregar_agregados(versao_historico())
+
+
+def indicadores_escola(inep, ano=None):
+    """Indicadores de uma escola num ano (por padrão, o último da escola), ou None"""
+    indicadores = carregar_indicadores()
+    da_escola = indicadores[indicadores['INEP'] == inep]
+    if ano is not None:
+        da_escola = da_escola[da_escola['ANO'] == ano]
+    return None if da_escola.empty else da_escola.iloc[-1]
@@ -0,0 +1,49 @@
+"""Índices de tabelas por grupo (por exemplo, escolas por SRE) para filtros sem máscaras.
+
+As linhas são ordenadas uma única vez por (grupo, ordem); cada grupo passa a ser uma fatia
+contígua e filtrar por um grupo é só recortar essa fatia.
+"""
+import numpy as np
+
+from sedu.cache import cache_compartilhado
+from sedu.reconciliacao import carregar_tabela_reconciliada, versoes_tabela_reconciliada
+
+TTL_INDICES = 3600
+
+
+class IndiceGrupos:
+    """Tabela ordenada por (grupo, ordem) com a fatia de linhas de cada grupo"""
+
+    def __init__(self, tabela, coluna_grupo, coluna_ordem):
+        chave_grupo = tabela[coluna_grupo].astype(str)
+        chave_ordem = tabela[coluna_ordem].astype(str)
+        posicoes = np.lexsort((chave_ordem.to_numpy(), chave_grupo.to_numpy()))
+        self.tabela = tabela.iloc[posicoes].reset_index(drop=True)
+
+        grupos = chave_grupo.to_numpy()[posicoes]
+        inicios = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]]) if len(grupos) else np.array([], int)
+        fins = np.r_[inicios[1:], len(grupos)]
+        self.fatias = {grupos[inicio]: slice(inicio, fim) for inicio, fim in zip(inicios, fins)}
+        # Opções do filtro, já em ordem alfabética
+        self.grupos = list(self.fatias)
+
+    def linhas(self, grupo=None):
+        """Linhas de um grupo (ou todas), já ordenadas, sem máscara nem nova ordenação"""
+        if grupo is None:
+            return self.tabela
+        fatia = self.fatias.get(grupo)
+        return self.tabela.iloc[fatia] if fatia is not None else self.tabela.iloc[:0]
+
+    def __len__(self):
+        return len(self.tabela)
+
+
+@cache_compartilhado(max_entradas=4, ttl=TTL_INDICES)
+def _carregar_escolas_por_sre(nome, versoes):
+    return IndiceGrupos(carregar_tabela_reconciliada(nome), 'SRE', 'ESCOLA')
+
+
+def carregar_escolas_por_sre(nome='escolas_prioritarias'):
+    """Índice SRE -> escolas da tabela (com INEP reconciliado), refeito a cada versão dos dados.
+    O índice é o mesmo para todas as sessões e não deve ser alterado"""
+    return _carregar_escolas_por_sre(nome, versoes_tabela_reconciliada(nome))
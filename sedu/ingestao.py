@@ -0,0 +1,48 @@
+"""Leitura das planilhas CSV: o arquivo é lido uma única vez, a codificação é detectada nos
+bytes e o pandas (motor C) processa o conteúdo já em memória.
+"""
+import codecs
+import io
+from pathlib import Path
+
+import pandas as pd
+
+# Marcas de ordem de bytes (BOM), das mais longas para as mais curtas
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+
+def detectar_codificacao(conteudo):
+    """Retorna (codificação, tamanho do BOM) dos bytes de um arquivo de texto.
+
+    Sem BOM, o conteúdo é UTF-8 se decodificar sem erros; senão cp1252 (planilhas do
+    Excel em português) e, se houver bytes indefinidos no cp1252, latin-1.
+    """
+    for bom, codificacao in _BOMS:
+        if conteudo.startswith(bom):
+            return codificacao, len(bom)
+
+    for codificacao in ('utf-8', 'cp1252'):
+        try:
+            conteudo.decode(codificacao)
+            return codificacao, 0
+        except UnicodeDecodeError:
+            continue
+
+    return 'latin-1', 0
+
+
+def ler_csv(caminho, **opcoes):
+    """Lê o CSV com a codificação detectada; a codificação fica em `df.attrs['codificacao']`"""
+    conteudo = Path(caminho).read_bytes()
+    codificacao, tamanho_bom = detectar_codificacao(conteudo)
+
+    df = pd.read_csv(io.BytesIO(conteudo[tamanho_bom:]), encoding=codificacao, engine='c', **opcoes)
+    df.attrs['codificacao'] = codificacao
+    df.attrs['bom'] = tamanho_bom > 0
+    return df
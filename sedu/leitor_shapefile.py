@@ -0,0 +1,205 @@
+"""Leitura parcial de shapefiles: filtra pela tabela de atributos (.dbf) e pelo retângulo
+envolvente antes de decodificar as geometrias, usando o índice .shx para ir direto aos registros.
+"""
+import mmap
+import struct
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import MultiPolygon, Polygon
+
+# Retângulos envolventes (xmin, ymin, xmax, ymax) em graus, SIRGAS 2000
+BBOX_UF = {
+    'ES': (-41.88, -21.31, -39.66, -17.89),
+}
+
+# Tipos de geometria poligonal do formato shapefile (Polygon, PolygonZ, PolygonM)
+_TIPOS_POLIGONO = {5, 15, 25}
+_TIPO_NULO = 0
+
+# Código que abre o cabeçalho (100 bytes) dos arquivos .shp e .shx
+_CODIGO_SHAPEFILE = 9994
+_TAMANHO_CABECALHO = 100
+
+
+def _validar_cabecalho(caminho):
+    """Confere o código e o tamanho declarados no cabeçalho de um .shp/.shx; levanta ValueError
+    com o motivo quando o arquivo não é um shapefile íntegro"""
+    with open(caminho, 'rb') as arquivo:
+        cabecalho = arquivo.read(_TAMANHO_CABECALHO)
+    if cabecalho.startswith(b'version https://git-lfs'):
+        raise ValueError(f"{caminho} não é um shapefile: é um ponteiro do Git LFS (rode `git lfs pull`)")
+    if len(cabecalho) < _TAMANHO_CABECALHO or struct.unpack_from('>i', cabecalho, 0)[0] != _CODIGO_SHAPEFILE:
+        raise ValueError(f"{caminho} não é um shapefile (código {_CODIGO_SHAPEFILE} ausente no cabeçalho)")
+    # Tamanho declarado em palavras de 16 bits
+    declarado = struct.unpack_from('>i', cabecalho, 24)[0] * 2
+    real = Path(caminho).stat().st_size
+    if declarado != real:
+        raise ValueError(f"{caminho} está incompleto: o cabeçalho declara {declarado} bytes e o arquivo tem {real}")
+
+
+def _ler_cabecalho_dbf(caminho_dbf):
+    """Retorna número de registros, tamanho do cabeçalho e a lista de campos do .dbf"""
+    with open(caminho_dbf, 'rb') as arquivo:
+        cabecalho = arquivo.read(32)
+        if len(cabecalho) < 32 or cabecalho.startswith(b'version https://git-lfs'):
+            raise ValueError(f"{caminho_dbf} não é uma tabela .dbf válida")
+        num_registros, tam_cabecalho, tam_registro = struct.unpack('<IHH', cabecalho[4:12])
+        if tam_cabecalho + num_registros * tam_registro > Path(caminho_dbf).stat().st_size:
+            raise ValueError(f"{caminho_dbf} está incompleto: menor que os {num_registros} registros declarados")
+
+        campos = []
+        while True:
+            descritor = arquivo.read(32)
+            if not descritor or descritor[0] == 0x0D:
+                break
+            nome = descritor[:11].split(b'\x00')[0].decode('ascii')
+            tipo = chr(descritor[11])
+            tamanho, decimais = descritor[16], descritor[17]
+            campos.append((nome, tipo, tamanho, decimais))
+
+    return num_registros, tam_cabecalho, campos
+
+
+def _codificacao(caminho_shp):
+    """Codificação dos textos do .dbf, indicada pelo arquivo .cpg quando existir"""
+    cpg = Path(caminho_shp).with_suffix('.cpg')
+    if cpg.exists():
+        return cpg.read_text(encoding='ascii').strip() or 'latin-1'
+    return 'latin-1'
+
+
+def _converter_campo(valores, tipo, decimais, codificacao):
+    """Converte a coluna de bytes de tamanho fixo para o tipo Python correspondente"""
+    textos = [v.decode(codificacao, errors='replace').strip() for v in valores]
+    if tipo in ('N', 'F'):
+        numeros = pd.to_numeric(pd.Series(textos), errors='coerce')
+        if decimais == 0 and numeros.notna().all():
+            return numeros.astype('int64')
+        return numeros
+    return pd.Series(textos, dtype='object')
+
+
+def _abrir_dbf(caminho_dbf):
+    """Mapeia os registros do .dbf em memória como um vetor estruturado de campos de bytes"""
+    num_registros, tam_cabecalho, campos = _ler_cabecalho_dbf(caminho_dbf)
+    tipo_registro = np.dtype([('_apagado', 'S1')] + [(nome, f'S{tamanho}') for nome, _, tamanho, _ in campos])
+    registros = np.memmap(caminho_dbf, dtype=tipo_registro, mode='r',
+                          offset=tam_cabecalho, shape=(num_registros,))
+    return registros, campos
+
+
+def _selecionar_registros(registros, coluna, valores, codificacao):
+    """Índices dos registros não apagados cujo campo `coluna` está em `valores`"""
+    ativos = registros['_apagado'] != b'*'
+    if coluna is None:
+        return np.flatnonzero(ativos)
+    procurados = [str(v).encode(codificacao) for v in valores]
+    coluna_bruta = np.char.strip(np.asarray(registros[coluna]))
+    return np.flatnonzero(np.isin(coluna_bruta, procurados) & ativos)
+
+
+def _decodificar_atributos(linhas, campos, codificacao):
+    """DataFrame com os campos decodificados das linhas selecionadas do .dbf"""
+    return pd.DataFrame({
+        nome: _converter_campo(linhas[nome], tipo, decimais, codificacao)
+        for nome, tipo, _, decimais in campos
+    })
+
+
+def ler_atributos_dbf(caminho_dbf, coluna=None, valores=None):
+    """Lê somente a tabela de atributos (.dbf), opcionalmente filtrada por `coluna` em `valores`"""
+    registros, campos = _abrir_dbf(caminho_dbf)
+    codificacao = _codificacao(caminho_dbf)
+    selecionados = _selecionar_registros(registros, coluna, valores, codificacao)
+    return _decodificar_atributos(registros[selecionados], campos, codificacao)
+
+
+def _anel_horario(pontos):
+    """Anéis externos do shapefile são horários (área com sinal negativa)"""
+    x, y = pontos[:, 0], pontos[:, 1]
+    return np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]) < 0
+
+
+def _decodificar_poligono(conteudo):
+    """Monta Polygon/MultiPolygon a partir do conteúdo binário de um registro poligonal"""
+    num_partes, num_pontos = struct.unpack_from('<2i', conteudo, 36)
+    inicio_partes = 44
+    partes = np.frombuffer(conteudo, dtype='<i4', count=num_partes, offset=inicio_partes)
+    pontos = np.frombuffer(conteudo, dtype='<f8', count=2 * num_pontos,
+                           offset=inicio_partes + 4 * num_partes).reshape(-1, 2)
+
+    limites = list(partes) + [num_pontos]
+    cascas, buracos = [], []
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        anel = pontos[inicio:fim]
+        if len(anel) < 4:
+            continue
+        (cascas if _anel_horario(anel) else buracos).append(anel)
+
+    # Cada buraco pertence à primeira casca que contém um ponto interno dele
+    poligonos_cascas = [Polygon(casca) for casca in cascas]
+    buracos_por_casca = [[] for _ in cascas]
+    for buraco in buracos:
+        ponto = Polygon(buraco).representative_point()
+        for i, casca in enumerate(poligonos_cascas):
+            if casca.contains(ponto):
+                buracos_por_casca[i].append(buraco)
+                break
+
+    poligonos = [Polygon(casca, furos) for casca, furos in zip(cascas, buracos_por_casca)]
+    if len(poligonos) == 1:
+        return poligonos[0]
+    return MultiPolygon(poligonos)
+
+
+def _intersecta(bbox_registro, bbox):
+    xmin, ymin, xmax, ymax = bbox_registro
+    return not (xmax < bbox[0] or xmin > bbox[2] or ymax < bbox[1] or ymin > bbox[3])
+
+
+def ler_shapefile_filtrado(caminho_shp, coluna, valores, bbox=None):
+    """Lê apenas os registros cujo atributo `coluna` está em `valores` (e que cruzam `bbox`)"""
+    caminho_shp = Path(caminho_shp)
+    caminho_dbf = caminho_shp.with_suffix('.dbf')
+    caminho_shx = caminho_shp.with_suffix('.shx')
+    codificacao = _codificacao(caminho_shp)
+    _validar_cabecalho(caminho_shp)
+    _validar_cabecalho(caminho_shx)
+
+    # 1) Varredura da coluna no .dbf, sem decodificar os demais campos
+    registros, campos = _abrir_dbf(caminho_dbf)
+    selecionados = _selecionar_registros(registros, coluna, valores, codificacao)
+
+    # 2) Posição de cada registro no .shp a partir do índice .shx (palavras de 16 bits)
+    indice = np.fromfile(caminho_shx, dtype='>i4', offset=100).reshape(-1, 2)
+    deslocamentos = indice[selecionados, 0].astype(np.int64) * 2 + 8
+    tamanhos = indice[selecionados, 1].astype(np.int64) * 2
+
+    # 3) Decodifica somente as geometrias selecionadas que cruzam o retângulo
+    geometrias, mantidos = [], []
+    with open(caminho_shp, 'rb') as arquivo, mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as shp:
+        for posicao, (inicio, tamanho) in enumerate(zip(deslocamentos, tamanhos)):
+            tipo = struct.unpack_from('<i', shp, inicio)[0]
+            if tipo == _TIPO_NULO:
+                continue
+            if tipo not in _TIPOS_POLIGONO:
+                raise ValueError(f"Tipo de geometria não suportado no shapefile: {tipo}")
+            if bbox is not None and not _intersecta(struct.unpack_from('<4d', shp, inicio + 4), bbox):
+                continue
+            geometrias.append(_decodificar_poligono(shp[inicio:inicio + tamanho]))
+            mantidos.append(selecionados[posicao])
+
+    # 4) Atributos apenas dos registros mantidos
+    atributos = _decodificar_atributos(registros[np.asarray(mantidos, dtype=np.int64)], campos, codificacao)
+
+    prj = caminho_shp.with_suffix('.prj')
+    crs = prj.read_text(encoding='ascii') if prj.exists() else None
+    return gpd.GeoDataFrame(atributos, geometry=geometrias, crs=crs)
+
+
+def ler_municipios_uf(caminho_shp, uf):
+    """Municípios de uma UF, filtrando por SIGLA_UF e pelo retângulo da UF quando conhecido"""
+    return ler_shapefile_filtrado(caminho_shp, 'SIGLA_UF', [uf], bbox=BBOX_UF.get(uf))
@@ -0,0 +1,97 @@
+"""Leitura tipada da planilha de localização das escolas e validação espacial das coordenadas."""
+import pandas as pd
+
+from sedu.ingestao import ler_csv
+from sedu.normalizacao import normalizar_serie
+
+COLUNAS_LOCALIZACAO = [
+    'NUMERO', 'SRE', 'ESCOLA', 'INEP', 'EQUIPE_RESPONSAVEL',
+    'LATITUDE', 'LONGITUDE', 'IDEBES_2024', 'META_2025'
+]
+
+# Limites gerais de latitude/longitude aceitos antes da verificação espacial
+_LAT_VALIDA = (-90, 90)
+_LON_VALIDA = (-180, 180)
+
+
+def ler_localizacao_escolas(caminho='mapa/escolas_prioritárias.csv'):
+    """Lê a planilha já com números em vírgula decimal convertidos e tipos definidos"""
+    escolas = ler_csv(
+        caminho,
+        sep=';',
+        skiprows=2,
+        header=None,
+        names=COLUNAS_LOCALIZACAO,
+        decimal=',',
+        dtype={
+            'NUMERO': 'Int64',
+            'SRE': 'string',
+            'ESCOLA': 'string',
+            'INEP': 'string',
+            'EQUIPE_RESPONSAVEL': 'string',
+            'LATITUDE': 'float64',
+            'LONGITUDE': 'float64',
+            'IDEBES_2024': 'float64',
+            'META_2025': 'float64',
+        },
+    )
+    # Há códigos INEP digitados com espaços; convertidos depois de limpos
+    escolas['INEP'] = pd.to_numeric(escolas['INEP'].str.strip(), errors='coerce').astype('Int64')
+    return escolas
+
+
+def _chave_nome(nomes):
+    """Chave de comparação: nome normalizado e sem o prefixo 'SRE'"""
+    return normalizar_serie(nomes).str.replace(r'^SRE\s+', '', regex=True)
+
+
+def validar_localizacao(escolas, municipios, municipio_sre):
+    """Acrescenta indicadores de qualidade das coordenadas a partir de uma junção espacial
+    vetorizada entre as escolas e os polígonos dos municípios. `municipio_sre` relaciona
+    o código IBGE (CD_MUN) de cada município à sua SRE.
+
+    Colunas acrescentadas: COORDENADA_VALIDA, DENTRO_UF, MUNICIPIO_PONTO, SRE_PONTO,
+    SRE_DIVERGENTE e, se a planilha tiver MUNICIPIO, MUNICIPIO_DIVERGENTE.
+    """
+    # geopandas só é necessário aqui; a leitura da planilha (usada pelo armazém) não o carrega
+    import geopandas as gpd
+
+    escolas = escolas.copy()
+    lat, lon = escolas['LATITUDE'], escolas['LONGITUDE']
+    escolas['COORDENADA_VALIDA'] = (lat.between(*_LAT_VALIDA) & lon.between(*_LON_VALIDA)).fillna(False)
+
+    # Junção ponto-em-polígono de todas as escolas de uma vez (índice espacial do geopandas)
+    validas = escolas[escolas['COORDENADA_VALIDA']]
+    pontos = gpd.GeoDataFrame(
+        validas[[]],
+        geometry=gpd.points_from_xy(validas['LONGITUDE'], validas['LATITUDE']),
+        crs=municipios.crs,
+    )
+    juncao = gpd.sjoin(pontos, municipios[['CD_MUN', 'NM_MUN', 'geometry']], how='left', predicate='within')
+    juncao = juncao[~juncao.index.duplicated(keep='first')]
+
+    escolas['MUNICIPIO_PONTO'] = juncao['NM_MUN'].reindex(escolas.index).astype('string')
+    escolas['DENTRO_UF'] = escolas['MUNICIPIO_PONTO'].notna()
+
+    sre_por_codigo = municipio_sre.dropna(subset=['CD_MUN']).set_index('CD_MUN')['SRE']
+    codigo_ponto = juncao['CD_MUN'].reindex(escolas.index).astype('string')
+    escolas['SRE_PONTO'] = codigo_ponto.map(sre_por_codigo).astype('string')
+
+    escolas['SRE_DIVERGENTE'] = (
+        escolas['DENTRO_UF'] & (_chave_nome(escolas['SRE_PONTO']) != _chave_nome(escolas['SRE']))
+    ).fillna(True)
+
+    if 'MUNICIPIO' in escolas.columns:
+        escolas['MUNICIPIO_DIVERGENTE'] = (
+            escolas['DENTRO_UF'] & (_chave_nome(escolas['MUNICIPIO_PONTO']) != _chave_nome(escolas['MUNICIPIO']))
+        ).fillna(True)
+
+    return escolas
+
+
+def escolas_com_pendencias(escolas):
+    """Escolas com coordenada inválida, fora da UF ou em município/SRE diferente do declarado"""
+    pendente = ~escolas['COORDENADA_VALIDA'] | ~escolas['DENTRO_UF'] | escolas['SRE_DIVERGENTE']
+    if 'MUNICIPIO_DIVERGENTE' in escolas.columns:
+        pendente |= escolas['MUNICIPIO_DIVERGENTE']
+    return escolas[pendente]
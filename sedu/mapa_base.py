@@ -0,0 +1,174 @@
+"""Cache local do mapa base (tiles raster) para a área do ES, servido pelo servidor de tiles.
+
+Os tiles são baixados uma única vez (etapa de semeadura, retomável) para um MBTiles em
+dados_derivados/ e o mapa passa a buscá-los no servidor local; o OpenStreetMap público só é
+usado pelo navegador para os tiles que faltarem no cache.
+
+Uso como etapa de build:
+
+    python -m sedu.mapa_base            # zooms 7 a 15
+    python -m sedu.mapa_base 12         # zooms 7 a 12
+
+A origem dos tiles vem de SEDU_MAPA_BASE_ORIGEM (modelo com {z}/{x}/{y}) e é obrigatória. A
+política de uso dos servidores públicos do OpenStreetMap não permite download em massa, por isso
+a semeadura recusa o tile.openstreetmap.org: aponte a origem para um servidor de tiles próprio ou
+contratado.
+"""
+import logging
+import math
+import os
+import sqlite3
+import sys
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from sedu.artefatos import PASTA_ARTEFATOS
+from sedu.leitor_shapefile import BBOX_UF
+from sedu.servidor_tiles import iniciar_servidor_tiles, registrar_mbtiles
+
+URL_OSM = 'https://tile.openstreetmap.org/{z}/{x}/{y}.png'
+ORIGEM_MAPA_BASE = os.environ.get('SEDU_MAPA_BASE_ORIGEM')
+ATRIBUICAO_OSM = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+
+ARQUIVO_MAPA_BASE = PASTA_ARTEFATOS / 'mapa_base_es.mbtiles'
+CONJUNTO_MAPA_BASE = 'mapa-base'
+
+# Mesmos limites de zoom do mapa do aplicativo
+ZOOM_MINIMO_BASE = 7
+ZOOM_MAXIMO_BASE = 15
+
+# Poucas conexões simultâneas, para não sobrecarregar a origem
+DOWNLOADS_SIMULTANEOS = 2
+AGENTE_USUARIO = 'sedu-escolas-prioritarias/1.0 (cache do mapa base)'
+
+_log = logging.getLogger(__name__)
+
+
+def tile_da_coordenada(longitude, latitude, zoom):
+    """Tile XYZ (x, y) que contém a coordenada"""
+    n = 2 ** zoom
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_da_area(bbox, zoom):
+    """Tiles (x, y) que cobrem o retângulo (oeste, sul, leste, norte) no zoom"""
+    oeste, sul, leste, norte = bbox
+    x0, y0 = tile_da_coordenada(oeste, norte, zoom)
+    x1, y1 = tile_da_coordenada(leste, sul, zoom)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def _abrir_cache(caminho):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    conexao = sqlite3.connect(caminho, check_same_thread=False)
+    conexao.executescript("""
+        CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT);
+        CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row);
+    """)
+    return conexao
+
+
+def validar_origem(origem):
+    """Confere a origem da semeadura: obrigatória e fora dos servidores públicos do OpenStreetMap.
+    Levanta ValueError"""
+    if not origem:
+        raise ValueError("Informe a origem dos tiles em SEDU_MAPA_BASE_ORIGEM (modelo com {z}/{x}/{y})")
+    servidor = urllib.parse.urlsplit(origem.format(z=0, x=0, y=0)).hostname or ''
+    if servidor == 'openstreetmap.org' or servidor.endswith('.openstreetmap.org'):
+        raise ValueError(f"A política de uso do OpenStreetMap não permite semear o cache a partir de {servidor}; "
+                         "use um servidor de tiles próprio ou contratado")
+    return origem
+
+
+def _baixar(origem, zoom, x, y):
+    requisicao = urllib.request.Request(origem.format(z=zoom, x=x, y=y), headers={'User-Agent': AGENTE_USUARIO})
+    with urllib.request.urlopen(requisicao, timeout=30) as resposta:
+        return resposta.read()
+
+
+def semear_mapa_base(bbox=BBOX_UF['ES'], zoom_minimo=ZOOM_MINIMO_BASE, zoom_maximo=ZOOM_MAXIMO_BASE,
+                     origem=ORIGEM_MAPA_BASE, caminho=ARQUIVO_MAPA_BASE):
+    """Baixa para o cache os tiles da área que ainda faltam; retorna (baixados, falhas)"""
+    validar_origem(origem)
+    conexao = _abrir_cache(caminho)
+    conexao.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)", [
+        ('name', 'Mapa base ES'), ('format', 'png'), ('type', 'baselayer'),
+        ('minzoom', str(zoom_minimo)), ('maxzoom', str(zoom_maximo)),
+        ('bounds', ','.join(str(valor) for valor in bbox)), ('attribution', ATRIBUICAO_OSM),
+    ])
+    trava = threading.Lock()
+    baixados, falhas = 0, 0
+
+    def baixar_e_gravar(zoom, x, y):
+        dados = _baixar(origem, zoom, x, y)
+        if not dados:
+            return False
+        with trava:
+            conexao.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", (zoom, x, 2 ** zoom - 1 - y, dados))
+        return True
+
+    try:
+        for zoom in range(zoom_minimo, zoom_maximo + 1):
+            # Retomável: só os tiles que ainda não estão no cache
+            existentes = {(coluna, 2 ** zoom - 1 - linha) for coluna, linha in conexao.execute(
+                "SELECT tile_column, tile_row FROM tiles WHERE zoom_level = ?", (zoom,))}
+            faltantes = [tile for tile in tiles_da_area(bbox, zoom) if tile not in existentes]
+            with ThreadPoolExecutor(max_workers=DOWNLOADS_SIMULTANEOS) as executor:
+                futuros = {executor.submit(baixar_e_gravar, zoom, x, y): (x, y) for x, y in faltantes}
+                for futuro, (x, y) in futuros.items():
+                    # Tile vazio ou com erro (de rede, de leitura ou do SQLite) fica de fora do cache:
+                    # nova tentativa na próxima semeadura, OSM no navegador até lá
+                    try:
+                        gravado = futuro.result()
+                    except Exception as erro:
+                        _log.debug("Tile %s/%s/%s não baixado: %r", zoom, x, y, erro)
+                        gravado = False
+                    if gravado:
+                        baixados += 1
+                    else:
+                        falhas += 1
+            conexao.commit()
+    finally:
+        conexao.commit()
+        conexao.close()
+    return baixados, falhas
+
+
+def mapa_base_disponivel(caminho=ARQUIVO_MAPA_BASE):
+    """Indica se o cache local do mapa base existe e tem tiles"""
+    if not caminho.exists():
+        return False
+    try:
+        with sqlite3.connect(f'file:{caminho}?mode=ro', uri=True) as conexao:
+            return conexao.execute("SELECT 1 FROM tiles LIMIT 1").fetchone() is not None
+    except sqlite3.Error:
+        return False
+
+
+def url_mapa_base():
+    """URL XYZ do mapa base no servidor local, ou None sem cache semeado ou sem servidor de tiles
+    configurado (o mapa usa o OSM)"""
+    if not mapa_base_disponivel():
+        return None
+    base = iniciar_servidor_tiles()
+    if base is None:
+        return None
+    registrar_mbtiles(CONJUNTO_MAPA_BASE, ARQUIVO_MAPA_BASE)
+    return f'{base}/{CONJUNTO_MAPA_BASE}/{{z}}/{{x}}/{{y}}.png'
+
+
+if __name__ == '__main__':
+    zoom_maximo = int(sys.argv[1]) if len(sys.argv) > 1 else ZOOM_MAXIMO_BASE
+    try:
+        validar_origem(ORIGEM_MAPA_BASE)
+    except ValueError as erro:
+        sys.exit(str(erro))
+    total = sum(len(tiles_da_area(BBOX_UF['ES'], zoom)) for zoom in range(ZOOM_MINIMO_BASE, zoom_maximo + 1))
+    print(f"Área do ES, zooms {ZOOM_MINIMO_BASE}-{zoom_maximo}: {total} tiles (origem: {ORIGEM_MAPA_BASE})")
+    baixados, falhas = semear_mapa_base(zoom_maximo=zoom_maximo)
+    print(f"{baixados} tiles baixados, {falhas} falhas: {ARQUIVO_MAPA_BASE}")
@@ -0,0 +1,229 @@
+"""Camada de municípios: extração da UF a partir do shapefile nacional, pirâmide de
+simplificação por faixa de zoom, relação município -> SRE, validação da localização das
+escolas contra os municípios e carga em cache.
+
+Uso como etapa de build (gera dados_derivados/municipios_es*.parquet):
+
+    python -m sedu.municipios ES
+"""
+import logging
+import sys
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+from sedu.armazem import FONTES, ler_tabela
+from sedu.artefatos import PASTA_ARTEFATOS, RAIZ, artefato_atualizado, hash_arquivo, registrar_artefato
+from sedu.cache import cache_compartilhado
+from sedu.leitor_shapefile import ler_atributos_dbf, ler_municipios_uf
+from sedu.localizacao import validar_localizacao
+from sedu.normalizacao import normalizar_serie
+
+ARQUIVO_SHAPEFILE = RAIZ / 'mapa' / 'BR_Municipios_2022.shp'
+ARQUIVO_ATRIBUTOS = ARQUIVO_SHAPEFILE.with_suffix('.dbf')
+ARQUIVO_REGIONAIS = FONTES['regionais'][0]
+ARQUIVO_LOCALIZACAO = FONTES['localizacao_escolas'][0]
+
+# Faixas de zoom do mapa (min_zoom=7 a max_zoom=15); cada faixa tem um nível da pirâmide
+FAIXAS_ZOOM = ((7, 8), (9, 10), (11, 12), (13, 15))
+
+# Tempo máximo (segundos) de uma camada no cache compartilhado entre sessões
+TTL_MUNICIPIOS = 3600
+
+_log = logging.getLogger(__name__)
+
+# Artefatos que o aplicativo teve de refazer por estarem desatualizados (nome -> vezes)
+_refeitos_no_aplicativo = {}
+
+
+def _refazer_no_aplicativo(destino, gerar, *argumentos):
+    """Refaz um artefato desatualizado durante a carga (caminho lento, que o pipeline evita),
+    deixando registro no log e em `artefatos_refeitos`"""
+    nome = Path(destino).name
+    _log.warning("%s desatualizado: refeito pelo aplicativo; rode `python -m sedu.pipeline`", nome)
+    _refeitos_no_aplicativo[nome] = _refeitos_no_aplicativo.get(nome, 0) + 1
+    return gerar(*argumentos)
+
+
+def artefatos_refeitos():
+    """Artefatos refeitos pelo aplicativo neste processo (nome -> vezes), para o aviso na tela"""
+    return dict(_refeitos_no_aplicativo)
+
+
+def caminho_municipios_uf(uf, nivel=None):
+    """Caminho do GeoParquet com os municípios de uma UF (original ou nível da pirâmide)"""
+    if nivel is None:
+        return PASTA_ARTEFATOS / f'municipios_{uf.lower()}.parquet'
+    return PASTA_ARTEFATOS / f'municipios_{uf.lower()}_nivel{nivel}.parquet'
+
+
+def nivel_para_zoom(zoom):
+    """Nível da pirâmide que atende o zoom informado"""
+    for nivel, (_, zoom_maximo) in enumerate(FAIXAS_ZOOM):
+        if zoom <= zoom_maximo:
+            return nivel
+    return len(FAIXAS_ZOOM) - 1
+
+
+def tolerancia_nivel(nivel):
+    """Tolerância em graus equivalente a cerca de um pixel no menor zoom da faixa"""
+    zoom_minimo = FAIXAS_ZOOM[nivel][0]
+    return 360.0 / (256 * 2 ** zoom_minimo)
+
+
+def extrair_municipios_uf(uf='ES', origem=ARQUIVO_SHAPEFILE):
+    """Lê somente os municípios da UF no shapefile nacional e grava um GeoParquet compacto"""
+    origem = Path(origem)
+    destino = caminho_municipios_uf(uf)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    # Filtro por SIGLA_UF e retângulo da UF aplicados antes de decodificar as geometrias
+    gdf_uf = ler_municipios_uf(origem, uf)
+    gdf_uf.to_parquet(destino, index=False)
+
+    registrar_artefato(destino, [origem, origem.with_suffix('.dbf')])
+    return destino
+
+
+def simplificar_cobertura(geometrias, tolerancia):
+    """Simplifica preservando as divisas compartilhadas entre municípios vizinhos"""
+    if hasattr(shapely, 'coverage_simplify'):
+        return shapely.coverage_simplify(geometrias, tolerancia, simplify_boundary=True)
+    # GEOS anterior à 3.12: simplificação individual, sem garantir as divisas em comum
+    return shapely.simplify(geometrias, tolerancia, preserve_topology=True)
+
+
+def gerar_piramide_uf(uf='ES'):
+    """Grava um GeoParquet simplificado para cada faixa de zoom a partir da camada da UF"""
+    origens = [ARQUIVO_SHAPEFILE, ARQUIVO_ATRIBUTOS]
+    base = caminho_municipios_uf(uf)
+    if not artefato_atualizado(base, origens):
+        extrair_municipios_uf(uf)
+    gdf_uf = gpd.read_parquet(base)
+
+    destinos = []
+    for nivel in range(len(FAIXAS_ZOOM)):
+        gdf_nivel = gdf_uf.copy()
+        gdf_nivel.geometry = simplificar_cobertura(gdf_uf.geometry.values, tolerancia_nivel(nivel))
+        destino = caminho_municipios_uf(uf, nivel)
+        gdf_nivel.to_parquet(destino, index=False)
+        registrar_artefato(destino, origens)
+        destinos.append(destino)
+    return destinos
+
+
+@cache_compartilhado(max_entradas=16, ttl=TTL_MUNICIPIOS)
+def _carregar_municipios_uf(uf, nivel, hashes_origem):
+    """Carrega o GeoParquet da UF; os hashes das origens fazem parte da chave do cache"""
+    destino = caminho_municipios_uf(uf, nivel)
+    if not artefato_atualizado(destino, [ARQUIVO_SHAPEFILE, ARQUIVO_ATRIBUTOS]):
+        _refazer_no_aplicativo(destino, extrair_municipios_uf if nivel is None else gerar_piramide_uf, uf)
+    return gpd.read_parquet(destino)
+
+
+def carregar_municipios_uf(uf='ES', zoom=None):
+    """Retorna os municípios da UF (simplificados para o zoom, se informado),
+    reprocessando apenas quando o shapefile mudar"""
+    nivel = None if zoom is None else nivel_para_zoom(zoom)
+    hashes = (hash_arquivo(ARQUIVO_SHAPEFILE), hash_arquivo(ARQUIVO_ATRIBUTOS))
+    return _carregar_municipios_uf(uf, nivel, hashes)
+
+
+def caminho_municipio_sre(uf):
+    """Caminho da tabela município (código IBGE) -> SRE de uma UF"""
+    return PASTA_ARTEFATOS / f'municipio_sre_{uf.lower()}.parquet'
+
+
+def gerar_municipio_sre(uf='ES'):
+    """Relaciona cada município da UF (código IBGE) à sua SRE pelo nome normalizado.
+
+    A junção é externa: municípios sem SRE ficam com SRE vazia e nomes da planilha de
+    regionais sem município correspondente ficam com CD_MUN vazio.
+    """
+    municipios = ler_atributos_dbf(ARQUIVO_ATRIBUTOS, 'SIGLA_UF', [uf])[['CD_MUN', 'NM_MUN']]
+    municipios['CHAVE'] = normalizar_serie(municipios['NM_MUN'])
+
+    regionais = ler_tabela('regionais')
+    regionais = pd.DataFrame({
+        'CHAVE': normalizar_serie(regionais['MUNICIPIO']),
+        'MUNICIPIO_REGIONAL': regionais['MUNICIPIO'].astype('string').str.strip(),
+        'SRE': regionais['REGIONAL_SRE'].astype('string').str.strip(),
+    })
+
+    juncao = municipios.merge(regionais, on='CHAVE', how='outer')
+    juncao['CD_MUN'] = juncao['CD_MUN'].astype('string')
+    juncao['NM_MUN'] = juncao['NM_MUN'].astype('string')
+
+    destino = caminho_municipio_sre(uf)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    juncao.to_parquet(destino, index=False)
+    registrar_artefato(destino, [ARQUIVO_ATRIBUTOS, ARQUIVO_REGIONAIS])
+    return destino
+
+
+@cache_compartilhado(max_entradas=4, ttl=TTL_MUNICIPIOS)
+def _carregar_municipio_sre(uf, hashes_origem):
+    destino = caminho_municipio_sre(uf)
+    if not artefato_atualizado(destino, [ARQUIVO_ATRIBUTOS, ARQUIVO_REGIONAIS]):
+        _refazer_no_aplicativo(destino, gerar_municipio_sre, uf)
+    return pd.read_parquet(destino)
+
+
+def carregar_municipio_sre(uf='ES'):
+    """Tabela CD_MUN, NM_MUN, MUNICIPIO_REGIONAL, SRE; refeita só quando o .dbf ou a planilha mudarem"""
+    hashes = (hash_arquivo(ARQUIVO_ATRIBUTOS), hash_arquivo(ARQUIVO_REGIONAIS))
+    return _carregar_municipio_sre(uf, hashes)
+
+
+def caminho_escolas_validadas(uf):
+    """Caminho da tabela de localização das escolas com os indicadores de validação"""
+    return PASTA_ARTEFATOS / f'escolas_validadas_{uf.lower()}.parquet'
+
+
+def _origens_escolas_validadas():
+    return [ARQUIVO_LOCALIZACAO, ARQUIVO_SHAPEFILE, ARQUIVO_ATRIBUTOS, ARQUIVO_REGIONAIS]
+
+
+def gerar_escolas_validadas(uf='ES'):
+    """Grava as escolas com coordenadas, já validadas contra os municípios e as SREs da UF"""
+    escolas = ler_tabela('localizacao_escolas').dropna(subset=['LATITUDE', 'LONGITUDE'])
+    validadas = validar_localizacao(escolas.reset_index(drop=True), carregar_municipios_uf(uf),
+                                    carregar_municipio_sre(uf))
+
+    destino = caminho_escolas_validadas(uf)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    validadas.to_parquet(destino, index=False)
+    registrar_artefato(destino, _origens_escolas_validadas())
+    return destino
+
+
+@cache_compartilhado(max_entradas=4, ttl=TTL_MUNICIPIOS)
+def _carregar_escolas_validadas(uf, hashes_origem):
+    destino = caminho_escolas_validadas(uf)
+    if not artefato_atualizado(destino, _origens_escolas_validadas()):
+        _refazer_no_aplicativo(destino, gerar_escolas_validadas, uf)
+    return pd.read_parquet(destino)
+
+
+def carregar_escolas_validadas(uf='ES'):
+    """Escolas com coordenadas e as colunas de validação; refeitas só quando a planilha de
+    localização, o shapefile ou a planilha de regionais mudarem"""
+    hashes = tuple(hash_arquivo(origem) for origem in _origens_escolas_validadas())
+    return _carregar_escolas_validadas(uf, hashes)
+
+
+def municipios_sem_correspondencia(municipio_sre):
+    """Nomes que não casaram: (municípios sem SRE, nomes da planilha de regionais sem município)"""
+    sem_sre = municipio_sre.loc[municipio_sre['SRE'].isna(), 'NM_MUN'].tolist()
+    sem_municipio = municipio_sre.loc[municipio_sre['CD_MUN'].isna(), 'MUNICIPIO_REGIONAL'].tolist()
+    return sem_sre, sem_municipio
+
+
+if __name__ == '__main__':
+    for sigla in (sys.argv[1:] or ['ES']):
+        print(f"{sigla}: {gerar_municipio_sre(sigla.upper())}")
+        print(f"{sigla}: {extrair_municipios_uf(sigla.upper())}")
+        for caminho in gerar_piramide_uf(sigla.upper()):
+            print(f"{sigla}: {caminho}")
@@ -0,0 +1,28 @@
+"""Normalização de nomes (municípios, escolas, SREs) para comparação entre planilhas.
+
+A chave de comparação é o nome em maiúsculas, sem acentos (decomposição Unicode NFKD,
+descartando as marcas combinantes) e com espaços simples.
+"""
+import re
+import unicodedata
+
+_ESPACOS = re.compile(r'\s+')
+# Acentos e cedilha após a decomposição NFKD (string comum: funciona no re e no motor do pyarrow)
+_MARCAS_COMBINANTES = '[\u0300-\u036f]'
+
+
+def normalizar_nome(nome):
+    """Chave de comparação de um nome: 'São José do Calçado' -> 'SAO JOSE DO CALCADO'"""
+    decomposto = unicodedata.normalize('NFKD', str(nome))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(' ', sem_acentos).strip().upper()
+
+
+def normalizar_serie(nomes):
+    """Versão vetorizada de `normalizar_nome` para uma Series do pandas (valores ausentes são mantidos)"""
+    return (nomes.astype('string')
+            .str.normalize('NFKD')
+            .str.replace(_MARCAS_COMBINANTES, '', regex=True)
+            .str.replace(_ESPACOS.pattern, ' ', regex=True)
+            .str.strip()
+            .str.upper())
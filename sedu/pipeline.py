@@ -0,0 +1,214 @@
+"""Pipeline de dados derivados: gera, fora do aplicativo, todos os artefatos que ele lê.
+
+Cada etapa tem as planilhas/shapefile de origem, os artefatos que produz e as etapas de que
+depende. Etapas independentes rodam em paralelo (um processo por etapa) e uma etapa cujos
+artefatos já foram gerados a partir das versões atuais das origens é pulada. Ao final, o
+manifesto dados_derivados/manifesto.json registra a versão (hashes das origens), os arquivos e
+a situação de cada etapa.
+
+Uso:
+
+    python -m sedu.pipeline                                # etapas padrão
+    python -m sedu.pipeline mestre historico_idebes        # só essas (e as de que dependem)
+    python -m sedu.pipeline --todas                        # inclui as opcionais (tiles do Brasil, mapa base)
+    python -m sedu.pipeline --forcar                       # refaz mesmo o que está em dia
+    python -m sedu.pipeline --listar
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+from sedu.armazem import FONTES, atualizar_tabela, caminho_tabela
+from sedu.artefatos import PASTA_ARTEFATOS, artefato_atualizado, hash_arquivo, registrar_artefato
+from sedu.historico import ARQUIVO_CATALOGO, PLANILHA_BASE, semear_historico
+from sedu.mapa_base import ARQUIVO_MAPA_BASE, semear_mapa_base
+from sedu.municipios import (ARQUIVO_ATRIBUTOS, ARQUIVO_LOCALIZACAO, ARQUIVO_REGIONAIS, ARQUIVO_SHAPEFILE,
+                             FAIXAS_ZOOM, caminho_escolas_validadas, caminho_municipio_sre, caminho_municipios_uf,
+                             gerar_escolas_validadas, gerar_municipio_sre, gerar_piramide_uf)
+from sedu.reconciliacao import ARQUIVO_MESTRE, TABELAS_COM_INEP, gerar_mestre
+from sedu.tiles_vetoriais import caminho_mbtiles, gerar_mbtiles, origens_mbtiles
+
+ARQUIVO_MANIFESTO = PASTA_ARTEFATOS / 'manifesto.json'
+
+# Processos simultâneos (as etapas pesadas são de CPU: shapefile, simplificação, tiles)
+PROCESSOS_PIPELINE = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+# executar: função sem argumentos (de módulo, para ir a outro processo); opcional: só roda se pedida
+Etapa = namedtuple('Etapa', ['nome', 'executar', 'origens', 'destinos', 'dependencias', 'opcional'],
+                   defaults=[(), False])
+
+
+def _semear_mapa_base():
+    """Semeia o cache do mapa base e o registra como em dia só se nenhum tile falhou"""
+    baixados, falhas = semear_mapa_base()
+    if falhas == 0:
+        registrar_artefato(ARQUIVO_MAPA_BASE, [])
+    return baixados, falhas
+
+
+def _etapas():
+    etapas = [
+        Etapa(f'tabela_{nome}', partial(atualizar_tabela, nome), [origem], [caminho_tabela(nome)])
+        for nome, (origem, _) in FONTES.items()
+    ]
+    etapas += [
+        Etapa('mestre', gerar_mestre, [FONTES[nome][0] for nome in TABELAS_COM_INEP], [ARQUIVO_MESTRE],
+              tuple(f'tabela_{nome}' for nome in TABELAS_COM_INEP)),
+        Etapa('historico_idebes', semear_historico, [PLANILHA_BASE], [ARQUIVO_CATALOGO], ('tabela_metas_idebes',)),
+        Etapa('municipio_sre_es', partial(gerar_municipio_sre, 'ES'), [ARQUIVO_ATRIBUTOS, ARQUIVO_REGIONAIS],
+              [caminho_municipio_sre('ES')], ('tabela_regionais',)),
+        Etapa('municipios_es', partial(gerar_piramide_uf, 'ES'), [ARQUIVO_SHAPEFILE, ARQUIVO_ATRIBUTOS],
+              [caminho_municipios_uf('ES')] + [caminho_municipios_uf('ES', nivel) for nivel in range(len(FAIXAS_ZOOM))]),
+        Etapa('escolas_validadas_es', partial(gerar_escolas_validadas, 'ES'),
+              [ARQUIVO_LOCALIZACAO, ARQUIVO_SHAPEFILE, ARQUIVO_ATRIBUTOS, ARQUIVO_REGIONAIS],
+              [caminho_escolas_validadas('ES')],
+              ('tabela_localizacao_escolas', 'municipio_sre_es', 'municipios_es')),
+        Etapa('tiles_municipios_es', partial(gerar_mbtiles, 'ES'), origens_mbtiles(), [caminho_mbtiles('ES')],
+              ('municipio_sre_es',)),
+        Etapa('tiles_municipios_br', gerar_mbtiles, origens_mbtiles(), [caminho_mbtiles('BR')],
+              ('municipio_sre_es',), opcional=True),
+        Etapa('mapa_base', _semear_mapa_base, [], [ARQUIVO_MAPA_BASE], opcional=True),
+    ]
+    return {etapa.nome: etapa for etapa in etapas}
+
+
+ETAPAS = _etapas()
+
+
+def etapa_atualizada(etapa):
+    """Indica se todos os artefatos da etapa foram gerados a partir das versões atuais das origens"""
+    return all(artefato_atualizado(destino, etapa.origens) for destino in etapa.destinos)
+
+
+def versao_etapa(etapa):
+    """Versão dos dados da etapa: hash dos hashes das origens"""
+    sha = hashlib.sha256()
+    for origem in etapa.origens:
+        sha.update(f'{Path(origem).name}:{hash_arquivo(origem)}\n'.encode())
+    return sha.hexdigest()[:16]
+
+
+def selecionar_etapas(nomes=None, incluir_opcionais=False):
+    """Etapas pedidas mais as de que dependem, na ordem de ETAPAS"""
+    if not nomes:
+        nomes = [nome for nome, etapa in ETAPAS.items() if incluir_opcionais or not etapa.opcional]
+    desconhecidas = [nome for nome in nomes if nome not in ETAPAS]
+    if desconhecidas:
+        raise KeyError(f"Etapas desconhecidas: {', '.join(desconhecidas)}")
+
+    selecionadas = set()
+    pendentes = list(nomes)
+    while pendentes:
+        nome = pendentes.pop()
+        if nome not in selecionadas:
+            selecionadas.add(nome)
+            pendentes.extend(ETAPAS[nome].dependencias)
+    return [nome for nome in ETAPAS if nome in selecionadas]
+
+
+def _executar_etapa(nome):
+    """Roda uma etapa (no processo de trabalho) e retorna a duração em segundos"""
+    inicio = time.perf_counter()
+    ETAPAS[nome].executar()
+    return time.perf_counter() - inicio
+
+
+def _registro_etapa(etapa, situacao, duracao=None, erro=None):
+    existentes = [Path(destino) for destino in etapa.destinos if Path(destino).exists()]
+    registro = {
+        'situacao': situacao,
+        'versao': versao_etapa(etapa),
+        'origens': {Path(origem).name: hash_arquivo(origem) for origem in etapa.origens},
+        'artefatos': {str(destino.relative_to(PASTA_ARTEFATOS)): destino.stat().st_size for destino in existentes},
+    }
+    if duracao is not None:
+        registro['duracao_s'] = round(duracao, 2)
+    if erro is not None:
+        registro['erro'] = erro
+    return registro
+
+
+def ler_manifesto():
+    """Manifesto da última execução do pipeline (vazio se não houver)"""
+    try:
+        return json.loads(ARQUIVO_MANIFESTO.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {'etapas': {}}
+
+
+def executar_pipeline(nomes=None, incluir_opcionais=False, forcar=False, processos=PROCESSOS_PIPELINE,
+                      informar=print):
+    """Executa as etapas selecionadas e grava o manifesto; retorna {etapa: situação}.
+
+    Situações: 'em dia' (pulada), 'executada', 'falhou' e 'bloqueada' (uma dependência falhou).
+    """
+    selecionadas = selecionar_etapas(nomes, incluir_opcionais)
+    manifesto = ler_manifesto()
+    situacoes = {}
+
+    def concluir(nome, situacao, duracao=None, erro=None):
+        situacoes[nome] = situacao
+        manifesto['etapas'][nome] = _registro_etapa(ETAPAS[nome], situacao, duracao, erro)
+        detalhe = f" ({duracao:.1f}s)" if duracao is not None else f": {erro}" if erro else ''
+        informar(f"{nome}: {situacao}{detalhe}")
+
+    PASTA_ARTEFATOS.mkdir(parents=True, exist_ok=True)
+    em_execucao = {}
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        while len(situacoes) < len(selecionadas):
+            for nome in selecionadas:
+                if nome in situacoes or nome in em_execucao.values():
+                    continue
+                dependencias = [dependencia for dependencia in ETAPAS[nome].dependencias if dependencia in selecionadas]
+                if any(situacoes.get(dependencia) in ('falhou', 'bloqueada') for dependencia in dependencias):
+                    concluir(nome, 'bloqueada')
+                elif all(dependencia in situacoes for dependencia in dependencias):
+                    if not forcar and etapa_atualizada(ETAPAS[nome]):
+                        concluir(nome, 'em dia')
+                    else:
+                        em_execucao[executor.submit(_executar_etapa, nome)] = nome
+
+            if not em_execucao:
+                continue
+            prontas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in prontas:
+                nome = em_execucao.pop(futuro)
+                try:
+                    concluir(nome, 'executada', duracao=futuro.result())
+                except Exception as erro:
+                    concluir(nome, 'falhou', erro=f"{type(erro).__name__}: {erro}")
+
+    manifesto['gerado_em'] = datetime.now().isoformat(timespec='seconds')
+    ARQUIVO_MANIFESTO.write_text(json.dumps(manifesto, indent=2, ensure_ascii=False), encoding='utf-8')
+    return situacoes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera os dados derivados lidos pelo aplicativo.')
+    parser.add_argument('etapas', nargs='*', help='etapas a executar (padrão: todas as não opcionais)')
+    parser.add_argument('--todas', action='store_true', help='inclui as etapas opcionais')
+    parser.add_argument('--forcar', action='store_true', help='refaz as etapas mesmo em dia')
+    parser.add_argument('--processos', type=int, default=PROCESSOS_PIPELINE, help='processos simultâneos')
+    parser.add_argument('--listar', action='store_true', help='lista as etapas e se estão em dia')
+    argumentos = parser.parse_args()
+
+    if argumentos.listar:
+        for nome, etapa in ETAPAS.items():
+            situacao = 'em dia' if etapa_atualizada(etapa) else 'pendente'
+            marcador = ' (opcional)' if etapa.opcional else ''
+            print(f"{nome}{marcador}: {situacao}")
+        sys.exit(0)
+
+    try:
+        resultado = executar_pipeline(argumentos.etapas, argumentos.todas, argumentos.forcar, argumentos.processos)
+    except KeyError as erro:
+        parser.error(erro.args[0])
+    sys.exit(1 if any(situacao in ('falhou', 'bloqueada') for situacao in resultado.values()) else 0)
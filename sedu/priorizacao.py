@@ -0,0 +1,187 @@
+"""Pontuação das escolas pelos critérios de seleção das Escolas Prioritárias.
+
+Cada critério vem de uma coluna de uma tabela de indicadores por escola (INEP). As colunas
+são normalizadas uma única vez para notas entre 0 e 1 (1 = mais prioritária) e guardadas numa
+matriz escola x critério; a pontuação com um conjunto de pesos é um único produto matricial e a
+lista de candidatas de cada SRE sai de uma seleção parcial (top-k) dentro do bloco da SRE.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from sedu.cache import cache_compartilhado
+from sedu.historico import versao_historico
+from sedu.indicadores import carregar_indicadores, resumo_ano
+
+Criterio = namedtuple('Criterio', ['coluna', 'sentido', 'rotulo'])
+
+# Critérios publicados para 2025: nome -> (coluna do indicador, sentido, rótulo).
+# Sentido +1: valor maior = escola mais prioritária; -1: valor menor = mais prioritária.
+CRITERIOS = {
+    'equidade': Criterio('PERC_ABAIXO_BASICO', +1, 'Equidade educacional'),
+    'desafio': Criterio('DESAFIO_CRESCIMENTO', +1, 'Desafio de crescimento'),
+    'historico': Criterio('TAXA_ATINGIMENTO', -1, 'Histórico de atingimento de metas'),
+    'matriculas': Criterio('MATRICULAS', +1, 'Número de matrículas'),
+    'complexidade': Criterio('COMPLEXIDADE_GESTAO', +1, 'Complexidade de gestão'),
+}
+
+PESOS_PADRAO = {nome: 1.0 for nome in CRITERIOS}
+
+# Escolas candidatas listadas por SRE
+CANDIDATAS_POR_SRE = 3
+
+TTL_PRIORIZACAO = 3600
+
+
+def indicadores_criterios(*tabelas_extras):
+    """Tabela por escola com as colunas dos critérios: desafio e histórico vêm da planilha de
+    metas; equidade, matrículas e complexidade, de tabelas extras (INEP + colunas), se houver"""
+    resumo = resumo_ano(carregar_indicadores())
+    tabela = pd.DataFrame({
+        'INEP': resumo['INEP'],
+        'ESCOLA': resumo['ESCOLA'],
+        'SRE': resumo['SRE'],
+        'DESAFIO_CRESCIMENTO': resumo['DESAFIO_CRESCIMENTO'],
+        'TAXA_ATINGIMENTO': resumo['ATINGIMENTOS_3_ANOS'] / resumo['AVALIADOS_3_ANOS'].replace(0, np.nan),
+    })
+    for extra in tabelas_extras:
+        tabela = tabela.merge(extra, on='INEP', how='left')
+    return tabela
+
+
+def _normalizar(valores, sentido):
+    """Notas entre 0 e 1 (1 = mais prioritária); valores ausentes ficam com 0"""
+    minimo, maximo = np.nanmin(valores), np.nanmax(valores)
+    if not np.isfinite(minimo) or maximo == minimo:
+        return np.zeros_like(valores)
+    notas = (valores - minimo) / (maximo - minimo)
+    if sentido < 0:
+        notas = 1.0 - notas
+    return np.nan_to_num(notas, nan=0.0)
+
+
+class MotorPrioridade:
+    """Notas normalizadas por critério e blocos por SRE, prontos para pontuar com qualquer peso"""
+
+    def __init__(self, tabela, criterios=CRITERIOS):
+        # Linhas agrupadas por SRE (ordem estável): cada SRE é uma fatia contígua
+        tabela = tabela.sort_values('SRE', kind='stable').reset_index(drop=True)
+        self.tabela = tabela
+        self.inep = tabela['INEP'].to_numpy(np.int64)
+        self.escola = tabela['ESCOLA'].astype(str).to_numpy()
+        self.sre = tabela['SRE'].astype(str).to_numpy()
+
+        # Só entram os critérios com indicador disponível na tabela
+        self.criterios = [nome for nome, criterio in criterios.items() if criterio.coluna in tabela.columns]
+        self.indisponiveis = [nome for nome in criterios if nome not in self.criterios]
+        self.notas = np.column_stack([
+            _normalizar(tabela[criterios[nome].coluna].to_numpy(np.float64), criterios[nome].sentido)
+            for nome in self.criterios
+        ]) if self.criterios else np.zeros((len(tabela), 0))
+
+        inicios = np.flatnonzero(np.r_[True, self.sre[1:] != self.sre[:-1]]) if len(tabela) else np.array([], int)
+        fins = np.r_[inicios[1:], len(tabela)]
+        self.blocos = {self.sre[inicio]: (inicio, fim) for inicio, fim in zip(inicios, fins)}
+
+    def vetor_pesos(self, pesos):
+        """Pesos na ordem das colunas de `notas` (critérios ausentes do dicionário valem 0)"""
+        return np.array([float(pesos.get(nome, 0.0)) for nome in self.criterios])
+
+    def pontuar(self, pesos):
+        """Pontuação de 0 a 100 de cada escola: média ponderada das notas dos critérios"""
+        vetor = self.vetor_pesos(pesos)
+        total = vetor.sum()
+        if total <= 0:
+            return np.zeros(len(self.inep))
+        return self.notas @ vetor * (100.0 / total)
+
+    def ranking(self, pontuacao):
+        """Posições das escolas da maior para a menor pontuação (empates na ordem da tabela)"""
+        return np.argsort(-pontuacao, kind='stable')
+
+    def top_k_por_sre(self, pontuacao, k=CANDIDATAS_POR_SRE):
+        """Posições das k escolas de maior pontuação de cada SRE, em ordem decrescente"""
+        selecionadas = {}
+        for sre, (inicio, fim) in self.blocos.items():
+            bloco = -pontuacao[inicio:fim]
+            if k < len(bloco):
+                # Seleção parcial: só as k melhores do bloco são ordenadas
+                melhores = np.argpartition(bloco, k - 1)[:k]
+            else:
+                melhores = np.arange(len(bloco))
+            selecionadas[sre] = inicio + melhores[np.argsort(bloco[melhores], kind='stable')]
+        return selecionadas
+
+    def tabela_pontuacao(self, pontuacao, posicoes=None):
+        """DataFrame com SRE, ESCOLA, INEP, notas por critério e pontuação das posições dadas"""
+        if posicoes is None:
+            posicoes = self.ranking(pontuacao)
+        tabela = pd.DataFrame({
+            'SRE': self.sre[posicoes],
+            'ESCOLA': self.escola[posicoes],
+            'INEP': self.inep[posicoes],
+        })
+        for coluna, nome in enumerate(self.criterios):
+            tabela[CRITERIOS[nome].rotulo] = self.notas[posicoes, coluna] * 100.0
+        tabela['PONTUAÇÃO'] = pontuacao[posicoes]
+        return tabela
+
+    def candidatas(self, pesos, k=CANDIDATAS_POR_SRE):
+        """Lista de candidatas por SRE (k por SRE), com a posição da escola na SRE"""
+        return self.candidatas_pontuacao(self.pontuar(pesos), k)
+
+    def candidatas_pontuacao(self, pontuacao, k=CANDIDATAS_POR_SRE):
+        """Como `candidatas`, a partir de uma pontuação já calculada"""
+        por_sre = self.top_k_por_sre(pontuacao, k)
+        posicoes = np.concatenate(list(por_sre.values())) if por_sre else np.array([], int)
+        tabela = self.tabela_pontuacao(pontuacao, posicoes)
+        tabela.insert(0, 'POSIÇÃO NA SRE', np.concatenate([np.arange(1, len(p) + 1) for p in por_sre.values()])
+                      if por_sre else [])
+        return tabela
+
+    def __len__(self):
+        return len(self.inep)
+
+
+class ReclassificacaoIncremental:
+    """Pontuação de uma sessão que acompanha a mudança dos pesos sem recalcular tudo.
+
+    Guarda a soma ponderada das notas; quando um peso muda, só a coluna desse critério é
+    somada de novo (com a diferença do peso). O motor é compartilhado e não é alterado.
+    """
+
+    def __init__(self, motor, pesos=PESOS_PADRAO):
+        self.motor = motor
+        self.pesos = motor.vetor_pesos(pesos)
+        self._soma = motor.notas @ self.pesos
+
+    def ajustar(self, pesos):
+        """Aplica os novos pesos e retorna quantos critérios foram recalculados"""
+        novos = self.motor.vetor_pesos(pesos)
+        alterados = np.flatnonzero(novos != self.pesos)
+        for coluna in alterados:
+            self._soma += self.motor.notas[:, coluna] * (novos[coluna] - self.pesos[coluna])
+        self.pesos = novos
+        return len(alterados)
+
+    def pontuacao(self):
+        """Pontuação de 0 a 100 com os pesos atuais"""
+        total = self.pesos.sum()
+        if total <= 0:
+            return np.zeros(len(self.motor))
+        return self._soma * (100.0 / total)
+
+    def candidatas(self, k=CANDIDATAS_POR_SRE):
+        """Lista de candidatas por SRE com os pesos atuais (seleção parcial em cada SRE)"""
+        return self.motor.candidatas_pontuacao(self.pontuacao(), k)
+
+
+@cache_compartilhado(max_entradas=2, ttl=TTL_PRIORIZACAO)
+def _carregar_motor(versao):
+    return MotorPrioridade(indicadores_criterios())
+
+
+def carregar_motor_prioridade():
+    """Motor de pontuação com os indicadores disponíveis, refeito quando um ano entrar no histórico"""
+    return _carregar_motor(versao_historico())
@@ -0,0 +1,189 @@
+"""Reconciliação de escolas entre planilhas: tabela mestre indexada pelo código INEP e
+busca aproximada de nomes para as planilhas que não trazem o INEP.
+
+Os nomes são comparados por trigramas de caracteres (coeficiente de Dice). Os candidatos
+vêm de um índice invertido trigrama -> escolas, separado por SRE (bloco), então cada busca
+só examina as escolas que compartilham trigramas com o nome procurado dentro da mesma SRE
+(e, se ali não houver escola parecida, no índice de todas as SREs).
+"""
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from sedu.armazem import FONTES, ler_tabela, versao_tabela
+from sedu.artefatos import PASTA_ARTEFATOS, artefato_atualizado, hash_arquivo, registrar_artefato
+from sedu.cache import cache_compartilhado
+from sedu.normalizacao import normalizar_serie
+
+# Tabelas do armazém que trazem o INEP, em ordem de preferência para o nome oficial
+TABELAS_COM_INEP = ['localizacao_escolas', 'metas_idebes']
+
+# Siglas do tipo de escola (EEEFM, EEEM, CEEMTI...) que variam entre planilhas para a mesma escola
+_PREFIXO_TIPO = r'^(?:CEEMTI|CEEFMTI|EEEFMTI|EEEMTI|EEEFM|EEEM|EEEF|EEUEF|EEEI)\s+'
+
+# Similaridade mínima (Dice sobre trigramas) para aceitar uma correspondência
+LIMIAR_SIMILARIDADE = 0.6
+
+ARQUIVO_MESTRE = PASTA_ARTEFATOS / 'escolas_mestre.parquet'
+TTL_MESTRE = 3600
+
+
+def chave_escola(nomes):
+    """Chave de comparação de nomes de escolas: sem acentos, pontuação e sigla do tipo"""
+    return (normalizar_serie(nomes)
+            .str.replace(r'[^A-Z0-9 ]', ' ', regex=True)
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.strip()
+            .str.replace(_PREFIXO_TIPO, '', regex=True))
+
+
+def chave_sre(nomes):
+    """Chave do bloco: nome da SRE normalizado e sem o prefixo 'SRE'"""
+    return normalizar_serie(nomes).str.replace(r'^SRE\s+', '', regex=True)
+
+
+def trigramas(texto):
+    """Conjunto de trigramas do texto, com espaços nas bordas para valorizar início e fim"""
+    texto = f'  {texto} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceEscolas:
+    """Índice invertido de trigramas por SRE para busca aproximada de nomes de escolas"""
+
+    def __init__(self, mestre):
+        self._inep = mestre['INEP'].tolist()
+        self._trigramas = [trigramas(chave) for chave in mestre['CHAVE']]
+        self._por_bloco = defaultdict(lambda: defaultdict(list))
+        self._geral = defaultdict(list)
+
+        for posicao, (bloco, grams) in enumerate(zip(mestre['BLOCO'], self._trigramas)):
+            for gram in grams:
+                self._por_bloco[bloco][gram].append(posicao)
+                self._geral[gram].append(posicao)
+
+    def buscar(self, chave, bloco=None, limiar=LIMIAR_SIMILARIDADE):
+        """Retorna (INEP, similaridade) da melhor escola do bloco, ou (None, melhor similaridade).
+        Se o bloco não existir ou não tiver escola parecida, busca em todas as SREs."""
+        grams = trigramas(chave)
+        if bloco in self._por_bloco:
+            inep, similaridade = self._melhor(self._por_bloco[bloco], grams)
+            if similaridade >= limiar:
+                return inep, similaridade
+
+        inep, similaridade = self._melhor(self._geral, grams)
+        if similaridade < limiar:
+            return None, similaridade
+        return inep, similaridade
+
+    def _melhor(self, indice, grams):
+        """Candidata com maior similaridade entre as que compartilham trigramas com o nome"""
+        # Quantos trigramas cada candidata compartilha com o nome procurado
+        compartilhados = Counter()
+        for gram in grams:
+            compartilhados.update(indice.get(gram, ()))
+
+        melhor_inep, melhor_similaridade = None, 0.0
+        for posicao, comuns in compartilhados.items():
+            similaridade = 2 * comuns / (len(grams) + len(self._trigramas[posicao]))
+            if similaridade > melhor_similaridade:
+                melhor_inep, melhor_similaridade = self._inep[posicao], similaridade
+        return melhor_inep, melhor_similaridade
+
+
+def construir_mestre():
+    """Uma linha por INEP com nome, SRE e município, a partir das planilhas que trazem o INEP"""
+    partes = []
+    for prioridade, nome in enumerate(TABELAS_COM_INEP):
+        tabela = ler_tabela(nome)
+        municipio = tabela['MUNICÍPIO'] if 'MUNICÍPIO' in tabela.columns else pd.Series(pd.NA, index=tabela.index)
+        partes.append(pd.DataFrame({
+            'INEP': tabela['INEP'].astype('Int64'),
+            'ESCOLA': tabela['ESCOLA'].astype('string').str.strip(),
+            'SRE': tabela['SRE'].astype('string').str.strip(),
+            'MUNICIPIO': municipio.astype('string'),
+            'PRIORIDADE': prioridade,
+        }))
+
+    todas = pd.concat(partes, ignore_index=True).dropna(subset=['INEP'])
+    todas = todas.sort_values(['INEP', 'PRIORIDADE'])
+
+    # Nome e SRE da fonte preferida; município da primeira fonte que o informa
+    mestre = todas.groupby('INEP', sort=True).agg(
+        ESCOLA=('ESCOLA', 'first'),
+        SRE=('SRE', 'first'),
+        MUNICIPIO=('MUNICIPIO', 'first'),
+    ).reset_index()
+    mestre['CHAVE'] = chave_escola(mestre['ESCOLA'])
+    mestre['BLOCO'] = chave_sre(mestre['SRE'])
+    return mestre
+
+
+def _origens_mestre():
+    return [FONTES[nome][0] for nome in TABELAS_COM_INEP]
+
+
+def gerar_mestre():
+    """Grava a tabela mestre de escolas"""
+    ARQUIVO_MESTRE.parent.mkdir(parents=True, exist_ok=True)
+    construir_mestre().to_parquet(ARQUIVO_MESTRE, index=False)
+    registrar_artefato(ARQUIVO_MESTRE, _origens_mestre())
+    return ARQUIVO_MESTRE
+
+
+@cache_compartilhado(max_entradas=2, ttl=TTL_MESTRE)
+def _carregar_mestre_e_indice(hashes_origem):
+    if not artefato_atualizado(ARQUIVO_MESTRE, _origens_mestre()):
+        gerar_mestre()
+    mestre = pd.read_parquet(ARQUIVO_MESTRE)
+    return mestre, IndiceEscolas(mestre)
+
+
+def versoes_mestre():
+    """Versões das planilhas com INEP de que a tabela mestre depende"""
+    return tuple(hash_arquivo(origem) for origem in _origens_mestre())
+
+
+def carregar_mestre():
+    """Tabela mestre e índice de busca, refeitos só quando alguma planilha com INEP mudar"""
+    return _carregar_mestre_e_indice(versoes_mestre())
+
+
+def reconciliar(df, coluna_escola='ESCOLA', coluna_sre='SRE'):
+    """Acrescenta INEP (o da própria planilha, se houver, ou o da escola mais parecida na
+    mesma SRE) e SIMILARIDADE (1.0 quando o INEP veio da planilha)"""
+    mestre, indice = carregar_mestre()
+    resultado = df.copy()
+
+    chaves = chave_escola(resultado[coluna_escola])
+    blocos = chave_sre(resultado[coluna_sre])
+    encontrados = [indice.buscar(chave, bloco) if pd.notna(chave) else (None, 0.0)
+                   for chave, bloco in zip(chaves, blocos)]
+
+    inep_encontrado = pd.array([inep for inep, _ in encontrados], dtype='Int64')
+    similaridade = pd.Series([sim for _, sim in encontrados], index=resultado.index, dtype='float64')
+
+    if 'INEP' in resultado.columns:
+        proprio = resultado['INEP'].astype('Int64')
+        resultado['INEP'] = proprio.fillna(pd.Series(inep_encontrado, index=resultado.index))
+        resultado['SIMILARIDADE'] = similaridade.where(proprio.isna(), 1.0)
+    else:
+        resultado['INEP'] = inep_encontrado
+        resultado['SIMILARIDADE'] = similaridade
+
+    return resultado
+
+
+@cache_compartilhado(max_entradas=8, ttl=TTL_MESTRE)
+def _carregar_tabela_reconciliada(nome, versoes):
+    return reconciliar(ler_tabela(nome))
+
+
+def versoes_tabela_reconciliada(nome):
+    """Versões dos dados de que a tabela reconciliada depende: a própria planilha e as com INEP"""
+    return (versao_tabela(nome),) + versoes_mestre()
+
+
+def carregar_tabela_reconciliada(nome):
+    """Tabela do armazém com a coluna INEP reconciliada, em cache por versão dos dados"""
+    return _carregar_tabela_reconciliada(nome, versoes_tabela_reconciliada(nome))
@@ -0,0 +1,144 @@
+"""Séries históricas de META e IDEBES por escola, pré-calculadas para consulta instantânea.
+
+O histórico de metas (todas as partições anuais) é ordenado uma única vez por (INEP, ANO);
+cada escola guarda fatias contíguas dos vetores de ano, meta e IDEBES, além das estatísticas
+já calculadas.
+"""
+from collections import Counter
+
+import numpy as np
+
+from sedu.cache import cache_compartilhado
+from sedu.historico import ler_historico, versao_historico
+
+TTL_SERIES = 3600
+
+
+def _medias_por_bloco(valores, inicios):
+    """Média de cada bloco contíguo ignorando NaN (NaN se o bloco não tiver valores)"""
+    presentes = ~np.isnan(valores)
+    somas = np.add.reduceat(np.where(presentes, valores, 0.0), inicios)
+    quantidades = np.add.reduceat(presentes.astype(np.int64), inicios)
+    return np.divide(somas, quantidades, out=np.full(len(inicios), np.nan), where=quantidades > 0)
+
+
+class SerieEscola:
+    """Série histórica de uma escola com estatísticas resumidas"""
+
+    __slots__ = ('inep', 'escola', 'sre', 'municipio', 'anos', 'meta', 'idebes',
+                 'media_meta', 'media_idebes', 'ano_avaliado', 'atingiu_ultimo_ano')
+
+    def __init__(self, inep, escola, sre, municipio, anos, meta, idebes, media_meta, media_idebes):
+        self.inep = inep
+        self.escola = escola
+        self.sre = sre
+        self.municipio = municipio
+        self.anos = anos
+        self.meta = meta
+        self.idebes = idebes
+        self.media_meta = media_meta
+        self.media_idebes = media_idebes
+        # Último ano com META e IDEBES (um ano divulgado só com a META ainda não foi avaliado)
+        avaliados = np.flatnonzero(~np.isnan(meta) & ~np.isnan(idebes))
+        self.ano_avaliado = int(anos[avaliados[-1]]) if len(avaliados) else None
+        self.atingiu_ultimo_ano = bool(len(avaliados) and idebes[avaliados[-1]] >= meta[avaliados[-1]])
+
+
+class ArmazemSeries:
+    """Séries de todas as escolas, com índices por INEP e por SRE (o nome não identifica a escola:
+    há escolas homônimas em SREs diferentes)"""
+
+    def __init__(self, metas):
+        # Ordem original de aparição das escolas (usada para a escola padrão de cada SRE)
+        ordem_original = metas.drop_duplicates('INEP')['INEP'].tolist()
+
+        ordenado = metas.sort_values(['INEP', 'ANO'], kind='stable')
+        inep = ordenado['INEP'].to_numpy(np.int64)
+        anos = np.ascontiguousarray(ordenado['ANO'].to_numpy(np.int64))
+        meta = np.ascontiguousarray(ordenado['META'].to_numpy(np.float64))
+        idebes = np.ascontiguousarray(ordenado['IDEBES'].to_numpy(np.float64))
+
+        # Início e fim do bloco de cada escola nos vetores ordenados
+        inicios = np.flatnonzero(np.r_[True, inep[1:] != inep[:-1]])
+        fins = np.r_[inicios[1:], len(inep)]
+        contagens = fins - inicios
+        medias_meta = _medias_por_bloco(meta, inicios)
+        medias_idebes = _medias_por_bloco(idebes, inicios)
+
+        escolas = ordenado['ESCOLA'].astype(str).to_numpy()
+        sres = ordenado['SRE'].astype(str).to_numpy()
+        municipios = (ordenado['MUNICÍPIO'].astype(str).to_numpy()
+                      if 'MUNICÍPIO' in ordenado.columns else np.full(len(inep), ''))
+
+        self.por_inep = {}
+        for i, (inicio, fim) in enumerate(zip(inicios, fins)):
+            self.por_inep[int(inep[inicio])] = SerieEscola(
+                int(inep[inicio]), escolas[inicio], sres[inicio], municipios[inicio],
+                anos[inicio:fim], meta[inicio:fim], idebes[inicio:fim],
+                float(medias_meta[i]), float(medias_idebes[i]),
+            )
+
+        self.sres = sorted({serie.sre for serie in self.por_inep.values()})
+
+        self.ineps_por_sre = {sre: [] for sre in self.sres}
+        for codigo in ordem_original:
+            self.ineps_por_sre[self.por_inep[int(codigo)].sre].append(int(codigo))
+        self.ineps_todas = [int(codigo) for codigo in ordem_original]
+
+        # INEPs em ordem alfabética dos nomes (opções de seleção de escola)
+        def por_nome(codigo):
+            return self.por_inep[codigo].escola, codigo
+        self.ineps_por_nome_sre = {sre: sorted(ineps, key=por_nome) for sre, ineps in self.ineps_por_sre.items()}
+        self.ineps_por_nome_todas = sorted(self.ineps_todas, key=por_nome)
+        contagem_nomes = Counter(serie.escola for serie in self.por_inep.values())
+        self._nomes_repetidos = {nome for nome, quantidade in contagem_nomes.items() if quantidade > 1}
+        # Matriz escola x ano (NaN onde a escola não tem o ano), base das comparações entre escolas
+        self.anos = np.unique(anos)
+        linhas = np.repeat(np.arange(len(inicios)), contagens)
+        colunas = np.searchsorted(self.anos, anos)
+        self.matriz_meta = np.full((len(inicios), len(self.anos)), np.nan)
+        self.matriz_idebes = np.full((len(inicios), len(self.anos)), np.nan)
+        self.matriz_meta[linhas, colunas] = meta
+        self.matriz_idebes[linhas, colunas] = idebes
+        self.ineps_matriz = inep[inicios]
+        self._linha_por_inep = {int(codigo): linha for linha, codigo in enumerate(self.ineps_matriz)}
+
+        self.ano_minimo = int(anos.min()) if len(anos) else None
+        self.ano_maximo = int(anos.max()) if len(anos) else None
+
+    def ineps_por_nome(self, sre=None):
+        """INEPs em ordem alfabética dos nomes das escolas, de uma SRE ou de todas"""
+        return self.ineps_por_nome_todas if sre is None else self.ineps_por_nome_sre.get(sre, [])
+
+    def rotulo(self, inep):
+        """Nome da escola para exibição; com a SRE quando outra escola tiver o mesmo nome"""
+        serie = self.por_inep[inep]
+        return f'{serie.escola} ({serie.sre})' if serie.escola in self._nomes_repetidos else serie.escola
+
+    def ineps(self, sre=None):
+        """INEPs na ordem da planilha, de uma SRE ou de todas"""
+        return self.ineps_todas if sre is None else self.ineps_por_sre.get(sre, [])
+
+    def matriz(self, sre=None):
+        """(INEPs, META, IDEBES) das escolas de uma SRE ou de todas, com uma linha por escola
+        (na ordem da planilha) e uma coluna por ano de `anos`"""
+        ineps = self.ineps(sre)
+        linhas = [self._linha_por_inep[codigo] for codigo in ineps]
+        return ineps, self.matriz_meta[linhas], self.matriz_idebes[linhas]
+
+    def serie(self, inep):
+        """Série de uma escola pelo INEP, ou None"""
+        return self.por_inep.get(inep)
+
+    def __len__(self):
+        return len(self.por_inep)
+
+
+@cache_compartilhado(max_entradas=2, ttl=TTL_SERIES)
+def _carregar_series(versao):
+    return ArmazemSeries(ler_historico())
+
+
+def carregar_series():
+    """Séries de metas e IDEBES, refeitas só quando um ano entrar no histórico"""
+    return _carregar_series(versao_historico())
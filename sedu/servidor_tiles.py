@@ -0,0 +1,146 @@
+"""Servidor HTTP local dos tiles do mapa.
+
+Roda numa thread do próprio processo do Streamlit, iniciado uma única vez, e atende
+`/<conjunto>/<z>/<x>/<y>.<ext>` a partir dos conjuntos registrados (por exemplo, um MBTiles).
+O navegador busca só os tiles da área visível, fora do websocket do Streamlit.
+
+O servidor só é iniciado quando SEDU_TILES_URL informa o endereço pelo qual o navegador o
+alcança (por exemplo, http://localhost:8765 para uso local ou o caminho publicado por um proxy);
+sem ela o mapa usa a camada GeoJSON dos municípios e o OpenStreetMap público.
+
+Variáveis de ambiente:
+- SEDU_TILES_URL: endereço do servidor visto pelo navegador (sem ela, o servidor não inicia);
+- SEDU_TILES_PORTA: porta local do servidor (padrão 8765);
+- SEDU_TILES_ENDERECO: interface em que o servidor escuta (padrão 127.0.0.1, só a máquina local).
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORTA_TILES = int(os.environ.get('SEDU_TILES_PORTA', 8765))
+ENDERECO_TILES = os.environ.get('SEDU_TILES_ENDERECO', '127.0.0.1')
+URL_PUBLICA_TILES = os.environ.get('SEDU_TILES_URL')
+
+# Tiles mudam só com um novo build; o navegador pode guardá-los por um dia
+CACHE_NAVEGADOR = 'public, max-age=86400'
+
+_TIPOS_CONTEUDO = {
+    'pbf': 'application/x-protobuf',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+_ROTA = re.compile(r'^/(?P<conjunto>[\w-]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.(?P<ext>\w+)$')
+
+_log = logging.getLogger(__name__)
+
+
+def _versao_arquivo(caminho):
+    # O build grava um novo arquivo e o troca pelo anterior: inode, mtime e tamanho mudam
+    info = os.stat(caminho)
+    return info.st_ino, info.st_mtime_ns, info.st_size
+
+
+class LeitorMBTiles:
+    """Leitura de tiles XYZ de um arquivo MBTiles (uma conexão somente leitura, compartilhada pelas
+    threads do servidor sob uma trava; as consultas são rápidas e não justificam uma por thread)"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.versao = _versao_arquivo(caminho)
+        self._conexao = sqlite3.connect(f'file:{caminho}?mode=ro', uri=True, check_same_thread=False)
+        self._trava = threading.Lock()
+
+    def __call__(self, z, x, y):
+        # MBTiles usa a numeração de linhas TMS (y invertido)
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, 2 ** z - 1 - y),
+            ).fetchone()
+        return None if linha is None else linha[0]
+
+
+# Conjuntos de tiles atendidos: nome -> função (z, x, y) -> bytes ou None
+_conjuntos = {}
+_trava = threading.Lock()
+_servidor = None
+
+
+def registrar_conjunto(nome, leitor):
+    """Passa a atender /<nome>/<z>/<x>/<y>.<ext> com `leitor(z, x, y)`"""
+    with _trava:
+        _conjuntos[nome] = leitor
+
+
+def registrar_mbtiles(nome, caminho):
+    """Atende /<nome>/... a partir de um MBTiles; o leitor (e sua conexão) só é trocado quando o
+    arquivo muda. O leitor anterior é fechado quando a última requisição deixa de usá-lo"""
+    with _trava:
+        atual = _conjuntos.get(nome)
+        if not (isinstance(atual, LeitorMBTiles) and atual.caminho == caminho
+                and atual.versao == _versao_arquivo(caminho)):
+            _conjuntos[nome] = atual = LeitorMBTiles(caminho)
+    return atual
+
+
+class _Requisicao(BaseHTTPRequestHandler):
+    def do_GET(self):
+        rota = _ROTA.match(self.path.split('?', 1)[0])
+        leitor = _conjuntos.get(rota['conjunto']) if rota else None
+        if leitor is None:
+            self.send_error(404)
+            return
+
+        try:
+            dados = leitor(int(rota['z']), int(rota['x']), int(rota['y']))
+        except Exception:
+            _log.exception("Erro ao ler o tile %s", self.path)
+            self.send_error(500)
+            return
+
+        if dados is None:
+            # Tile vazio (fora da área): sem conteúdo, para o navegador não tentar de novo
+            self.send_response(204)
+            self._cabecalhos_comuns()
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self._cabecalhos_comuns()
+        self.send_header('Content-Type', _TIPOS_CONTEUDO.get(rota['ext'], 'application/octet-stream'))
+        if dados[:2] == b'\x1f\x8b':
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _cabecalhos_comuns(self):
+        # O mapa é servido pelo Streamlit (outra origem)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', CACHE_NAVEGADOR)
+
+    def log_message(self, formato, *args):
+        _log.debug(formato, *args)
+
+
+def iniciar_servidor_tiles(porta=PORTA_TILES, endereco=ENDERECO_TILES):
+    """Inicia o servidor (uma vez por processo) e retorna a URL base vista pelo navegador, ou None
+    sem SEDU_TILES_URL ou se não for possível abrir a porta"""
+    global _servidor
+    if not URL_PUBLICA_TILES:
+        return None
+    with _trava:
+        if _servidor is None:
+            try:
+                _servidor = ThreadingHTTPServer((endereco, porta), _Requisicao)
+            except OSError as erro:
+                _log.warning("Servidor de tiles indisponível na porta %s: %s", porta, erro)
+                return None
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, name='servidor-tiles', daemon=True).start()
+    return URL_PUBLICA_TILES.rstrip('/')
@@ -0,0 +1,212 @@
+"""Tiles vetoriais (MVT) da camada de municípios, gravados num arquivo MBTiles.
+
+Em vez de embutir todos os polígonos no HTML do mapa, o navegador busca no servidor local de
+tiles (`sedu.servidor_tiles`) apenas os tiles da área visível. Cada zoom usa geometrias
+simplificadas para cerca de um pixel, com as divisas entre municípios preservadas. A camada só é
+usada quando o servidor de tiles está configurado (SEDU_TILES_URL).
+
+Uso como etapa de build (gera dados_derivados/municipios_br.mbtiles, ou só de uma UF):
+
+    python -m sedu.tiles_vetoriais
+    python -m sedu.tiles_vetoriais ES
+"""
+import gzip
+import json
+import sqlite3
+import sys
+
+import mapbox_vector_tile
+import numpy as np
+import pandas as pd
+import shapely
+
+from sedu.artefatos import PASTA_ARTEFATOS, artefato_atualizado, registrar_artefato
+from sedu.leitor_shapefile import ler_shapefile_filtrado, ler_municipios_uf
+from sedu.municipios import (ARQUIVO_ATRIBUTOS, ARQUIVO_REGIONAIS, ARQUIVO_SHAPEFILE, carregar_municipio_sre,
+                             simplificar_cobertura)
+from sedu.servidor_tiles import iniciar_servidor_tiles, registrar_mbtiles
+
+# Abrangência padrão dos tiles: todos os municípios do Brasil
+ABRANGENCIA_NACIONAL = 'BR'
+
+CAMADA_MUNICIPIOS = 'municipios'
+ZOOM_MINIMO_TILES = 4
+ZOOM_MAXIMO_TILES = 12
+
+# Resolução interna do tile e margem (em unidades do tile) para as bordas não falharem
+EXTENSAO_TILE = 4096
+MARGEM_TILE = 64
+
+# Metade da largura do mundo em Web Mercator (EPSG:3857), em metros
+_LIMITE_MERCATOR = 20037508.342789244
+
+_COLUNAS_PROPRIEDADES = ['CD_MUN', 'NM_MUN', 'SIGLA_UF', 'SRE']
+
+
+def caminho_mbtiles(abrangencia=ABRANGENCIA_NACIONAL):
+    """Caminho do MBTiles dos municípios do Brasil ('BR') ou de uma UF"""
+    return PASTA_ARTEFATOS / f'municipios_{abrangencia.lower()}.mbtiles'
+
+
+def origens_mbtiles():
+    """Arquivos de origem dos tiles: shapefile, atributos e planilha de regionais"""
+    return [ARQUIVO_SHAPEFILE, ARQUIVO_ATRIBUTOS, ARQUIVO_REGIONAIS]
+
+
+def mbtiles_atualizado(abrangencia=ABRANGENCIA_NACIONAL):
+    """Indica se o MBTiles existe e foi gerado a partir das versões atuais das origens"""
+    return artefato_atualizado(caminho_mbtiles(abrangencia), origens_mbtiles())
+
+
+def tamanho_tile(zoom):
+    """Largura de um tile em metros (Web Mercator) no zoom informado"""
+    return 2 * _LIMITE_MERCATOR / 2 ** zoom
+
+
+def limites_tile(zoom, x, y):
+    """Retângulo (xmin, ymin, xmax, ymax) do tile XYZ em Web Mercator"""
+    tamanho = tamanho_tile(zoom)
+    xmin = -_LIMITE_MERCATOR + x * tamanho
+    ymax = _LIMITE_MERCATOR - y * tamanho
+    return xmin, ymax - tamanho, xmin + tamanho, ymax
+
+
+def _municipios(abrangencia):
+    """Municípios (em Web Mercator) com as propriedades dos tiles, inclusive a SRE"""
+    if abrangencia == ABRANGENCIA_NACIONAL:
+        municipios = ler_shapefile_filtrado(ARQUIVO_SHAPEFILE, None, None)
+    else:
+        municipios = ler_municipios_uf(ARQUIVO_SHAPEFILE, abrangencia)
+
+    # SRE dos municípios do ES pelo código IBGE (os demais ficam sem SRE)
+    municipio_sre = carregar_municipio_sre('ES').dropna(subset=['CD_MUN'])
+    municipios = municipios.merge(municipio_sre[['CD_MUN', 'SRE']], on='CD_MUN', how='left')
+    municipios['SRE'] = municipios['SRE'].fillna('')
+    return municipios.to_crs(epsg=3857)
+
+
+def _faixa_tiles(minimos, maximos, tamanho, zoom):
+    """Intervalo de índices de tile (inclusivo) que cobre cada coordenada mínima/máxima"""
+    ultimo = 2 ** zoom - 1
+    primeiro_idx = np.clip(np.floor(minimos / tamanho).astype(np.int64), 0, ultimo)
+    ultimo_idx = np.clip(np.floor(maximos / tamanho).astype(np.int64), 0, ultimo)
+    return primeiro_idx, ultimo_idx
+
+
+def _tiles_do_zoom(geometrias, propriedades, zoom):
+    """Gera (x, y, tile MVT comprimido) de um zoom"""
+    tamanho = tamanho_tile(zoom)
+    simplificadas = simplificar_cobertura(geometrias, tamanho / 256)
+
+    # Tiles cobertos pelo retângulo de cada município
+    limites = shapely.bounds(simplificadas)
+    x0, x1 = _faixa_tiles(limites[:, 0] + _LIMITE_MERCATOR, limites[:, 2] + _LIMITE_MERCATOR, tamanho, zoom)
+    y0, y1 = _faixa_tiles(_LIMITE_MERCATOR - limites[:, 3], _LIMITE_MERCATOR - limites[:, 1], tamanho, zoom)
+
+    por_tile = {}
+    for indice in np.flatnonzero(~shapely.is_empty(simplificadas)):
+        for x in range(x0[indice], x1[indice] + 1):
+            for y in range(y0[indice], y1[indice] + 1):
+                por_tile.setdefault((x, y), []).append(indice)
+
+    margem = tamanho * MARGEM_TILE / EXTENSAO_TILE
+    for (x, y), indices in por_tile.items():
+        xmin, ymin, xmax, ymax = limites_tile(zoom, x, y)
+        recortes = shapely.clip_by_rect(simplificadas[indices], xmin - margem, ymin - margem,
+                                        xmax + margem, ymax + margem)
+        feicoes = [{'geometry': recorte, 'properties': propriedades[indice]}
+                   for recorte, indice in zip(recortes, indices) if not recorte.is_empty]
+        if not feicoes:
+            continue
+        dados = mapbox_vector_tile.encode(
+            [{'name': CAMADA_MUNICIPIOS, 'features': feicoes}],
+            default_options={'quantize_bounds': (xmin, ymin, xmax, ymax), 'extents': EXTENSAO_TILE},
+        )
+        yield x, y, gzip.compress(dados)
+
+
+def _criar_mbtiles(caminho, metadados):
+    conexao = sqlite3.connect(caminho)
+    conexao.executescript("""
+        CREATE TABLE metadata (name TEXT, value TEXT);
+        CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+    """)
+    conexao.executemany("INSERT INTO metadata VALUES (?, ?)", list(metadados.items()))
+    return conexao
+
+
+def gerar_mbtiles(abrangencia=ABRANGENCIA_NACIONAL, zoom_minimo=ZOOM_MINIMO_TILES, zoom_maximo=ZOOM_MAXIMO_TILES):
+    """Gera o MBTiles com os tiles vetoriais dos municípios (e suas SREs) de zoom_minimo a zoom_maximo"""
+    municipios = _municipios(abrangencia)
+    geometrias = municipios.geometry.values
+    propriedades = (municipios[_COLUNAS_PROPRIEDADES].astype('string').fillna('')
+                    .astype(object).to_dict('records'))
+
+    oeste, sul, leste, norte = municipios.to_crs(epsg=4326).total_bounds
+    metadados = {
+        'name': f'Municípios {abrangencia}',
+        'format': 'pbf',
+        'type': 'overlay',
+        'minzoom': str(zoom_minimo),
+        'maxzoom': str(zoom_maximo),
+        'bounds': f'{oeste},{sul},{leste},{norte}',
+        'center': f'{(oeste + leste) / 2},{(sul + norte) / 2},{zoom_minimo}',
+        'json': json.dumps({'vector_layers': [{
+            'id': CAMADA_MUNICIPIOS,
+            'fields': {coluna: 'String' for coluna in _COLUNAS_PROPRIEDADES},
+            'minzoom': zoom_minimo,
+            'maxzoom': zoom_maximo,
+        }]}),
+    }
+
+    # Grava num arquivo temporário e só então substitui o MBTiles em uso pelo servidor
+    destino = caminho_mbtiles(abrangencia)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + '.tmp')
+    temporario.unlink(missing_ok=True)
+    conexao = _criar_mbtiles(temporario, metadados)
+    try:
+        for zoom in range(zoom_minimo, zoom_maximo + 1):
+            ultima_linha = 2 ** zoom - 1
+            # MBTiles usa a numeração de linhas TMS (y invertido)
+            conexao.executemany(
+                "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                ((zoom, x, ultima_linha - y, dados) for x, y, dados in _tiles_do_zoom(geometrias, propriedades, zoom)),
+            )
+            conexao.commit()
+    finally:
+        conexao.close()
+    temporario.replace(destino)
+
+    registrar_artefato(destino, origens_mbtiles())
+    return destino
+
+
+def url_tiles_municipios(abrangencias=(ABRANGENCIA_NACIONAL, 'ES')):
+    """URL XYZ dos tiles de municípios no servidor local, usando o primeiro MBTiles em dia entre as
+    abrangências informadas; None se nenhum estiver pronto ou se o servidor não estiver configurado
+    (SEDU_TILES_URL), e o mapa usa então a camada GeoJSON"""
+    for abrangencia in abrangencias:
+        if not mbtiles_atualizado(abrangencia):
+            continue
+        base = iniciar_servidor_tiles()
+        if base is None:
+            return None
+        conjunto = f'municipios-{abrangencia.lower()}'
+        registrar_mbtiles(conjunto, caminho_mbtiles(abrangencia))
+        return f'{base}/{conjunto}/{{z}}/{{x}}/{{y}}.pbf'
+    return None
+
+
+def total_tiles(caminho):
+    """Quantidade de tiles por zoom de um MBTiles"""
+    with sqlite3.connect(f'file:{caminho}?mode=ro', uri=True) as conexao:
+        return pd.read_sql("SELECT zoom_level, COUNT(*) AS tiles FROM tiles GROUP BY zoom_level", conexao)
+
+
+if __name__ == '__main__':
+    abrangencia = (sys.argv[1] if len(sys.argv) > 1 else ABRANGENCIA_NACIONAL).upper()
+    caminho = gerar_mbtiles(abrangencia)
+    print(f"{abrangencia}: {caminho}")
+    print(total_tiles(caminho).to_string(index=False))
@@ -1,9 +1,13 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import folium
-from streamlit_folium import st_folium
-import geopandas as gpd
+
+# Só os módulos leves são importados aqui; pandas, folium, geopandas e plotly (e os módulos de
+# dados que dependem deles) são importados pelas seções que os usam e pré-carregados em
+# segundo plano pelo aquecimento
+from sedu.aquecimento import aquecer_dependencias, estatisticas_aquecimento
+from sedu.cache import estatisticas_caches, obter_cache
+
+# Na primeira execução do processo, carrega as dependências pesadas sem atrasar a página
+aquecer_dependencias()
 
 
 # --- Barra lateral para navegação ---
@@ -12,79 +16,92 @@ st.sidebar.title("Navegação")
 selecao = st.sidebar.radio("Escolha a seção:",
                            ["Página Inicial", "Introdução", "Critérios de Seleção", "Gráficos", "Mapas"])
 
-# --- Função para carregar os dados do arquivo limpo ---
+# --- Busca de escolas (disponível em todas as seções) ---
+consulta_escola = st.sidebar.text_input("🔎 Buscar escola", placeholder="Nome, município, SRE ou INEP")
+if consulta_escola.strip():
+    import pandas as pd
+
+    from sedu.busca import buscar_escolas
+
+    try:
+        resultados_busca = buscar_escolas(consulta_escola)
+    except Exception as e:
+        st.sidebar.error(f"Erro na busca: {e}")
+    else:
+        if resultados_busca.empty:
+            st.sidebar.caption("Nenhuma escola encontrada.")
+        for _, escola_encontrada in resultados_busca.iterrows():
+            municipio = escola_encontrada['MUNICIPIO'] if pd.notna(escola_encontrada['MUNICIPIO']) else None
+            st.sidebar.markdown(
+                f"**{escola_encontrada['ESCOLA']}**  \n"
+                f"{escola_encontrada['SRE']}{' · ' + municipio if municipio else ''} · INEP {escola_encontrada['INEP']}"
+            )
+
+# --- Função para carregar os dados do arquivo limpo (usada na seção Critérios de Seleção) ---
 def carregar_dados_escolas():
     """Carrega o arquivo CSV limpo das escolas prioritárias"""
+    from sedu.reconciliacao import carregar_tabela_reconciliada
+
     try:
-        # Tenta carregar o arquivo limpo
-        dados = pd.read_csv('planilhas/Escolas_Prioritarias_LIMPO.csv', encoding='utf-8')
+        # Cópia colunar do arquivo limpo com o INEP reconciliado (cache compartilhado entre as sessões)
+        dados = carregar_tabela_reconciliada('escolas_prioritarias')
         return dados
     except Exception as e:
         st.error(f"Erro ao carregar o arquivo limpo: {e}")
         return None
 
-# --- Função para carregar dados de Metas e IDEB ---
-@st.cache_data
+# --- Função para carregar dados de Metas e IDEB (usada na seção Gráficos) ---
 def carregar_dados_metas_ideb():
-    """Carrega os dados de metas e IDEB"""
+    """Carrega as séries de metas e IDEB por escola"""
+    from sedu.series import carregar_series
+
     try:
-        # Tentar diferentes codificações
-        codificacoes = ['latin-1', 'iso-8859-1', 'cp1252', 'utf-8']
-        
-        for encoding in codificacoes:
-            try:
-                df = pd.read_csv('planilhas/metas e idebes.csv', sep=';', decimal=',', encoding=encoding)
-                return df
-            except UnicodeDecodeError:
-                continue
-            except Exception:
-                continue
-        
-        # Última tentativa
-        df = pd.read_csv('planilhas/metas e idebes.csv', sep=';', decimal=',', encoding='latin-1', engine='python')
-        return df
+        # Séries pré-calculadas a partir da cópia colunar, em cache compartilhado entre as sessões
+        return carregar_series()
     except Exception as e:
         st.error(f"Erro ao carregar arquivo de metas e IDEB: {e}")
-        return pd.DataFrame()
+        return None
 
 # --- Função para criar o mapa interativo ---
-def criar_mapa_escolas():
-    """Cria mapa interativo com as escolas prioritárias e municípios com SRE"""
+def criar_mapa_escolas(zoom=8, url_municipios=None, url_base=None):
+    """Cria mapa interativo com as escolas prioritárias e municípios com SRE.
+    Com `url_municipios`, os municípios vêm de tiles vetoriais do servidor local;
+    com `url_base`, o mapa base vem do cache local de tiles (OpenStreetMap como reserva).
+    Retorna (mapa, escolas, erro da camada de municípios ou None)"""
+    # Importados aqui (e não no topo) para que as outras seções não esperem por folium e geopandas
+    import folium
+
+    from sedu.armazem import carregar_tabela
+    from sedu.camadas import (LIMITE_MARCADORES_INDIVIDUAIS, CamadaMunicipiosVetoriais, MapaBaseLocal,
+                              adicionar_escolas_agrupadas)
+    from sedu.mapa_base import ATRIBUICAO_OSM, URL_OSM
+    from sedu.municipios import carregar_escolas_validadas, carregar_municipio_sre, carregar_municipios_uf
+    from sedu.tiles_vetoriais import CAMADA_MUNICIPIOS, ZOOM_MAXIMO_TILES
+
     try:
-        # Carregar dados das escolas
-        df_escolas = pd.read_csv('mapa/escolas_prioritárias.csv', sep=';', encoding='utf-8', skiprows=1)
-        
-        # Renomear colunas
-        novas_colunas = [
-            'NUMERO', 'SRE', 'ESCOLA', 'INEP', 'EQUIPE_RESPONSAVEL', 
-            'LATITUDE', 'LONGITUDE', 'IDEBES_2024', 'META_2025'
-        ]
-        df_escolas.columns = novas_colunas
-        
-        # Limpar e preparar dados
-        df_escolas_clean = df_escolas.dropna(subset=['LATITUDE', 'LONGITUDE']).copy()
-        df_escolas_clean['LATITUDE'] = df_escolas_clean['LATITUDE'].astype(str).str.replace(',', '.').astype(float)
-        df_escolas_clean['LONGITUDE'] = df_escolas_clean['LONGITUDE'].astype(str).str.replace(',', '.').astype(float)
-        
-        # Carregar relação município-SRE
-        df_regionais = pd.read_csv('mapa/regionais_sedu.csv')
-        
-        # Criar dicionário município -> SRE
-        municipio_para_sre = {}
-        for idx, row in df_regionais.iterrows():
-            municipio = row['MUNICIPIO'].upper().strip()
-            sre = row['REGIONAL_SRE'].strip()
-            municipio_para_sre[municipio] = sre
+        # Escolas com coordenadas já validadas (dentro do ES e no município/SRE declarados),
+        # geradas pelo pipeline de dados derivados
+        try:
+            df_escolas_clean = carregar_escolas_validadas('ES')
+        except Exception:
+            # Sem a camada de municípios a validação espacial fica indisponível
+            df_escolas_clean = carregar_tabela('localizacao_escolas').dropna(subset=['LATITUDE', 'LONGITUDE'])
         
         # Criar mapa base
         mapa = folium.Map(
             location=[-20.0, -40.5],
             zoom_start=8,
-            tiles='OpenStreetMap',
+            tiles='OpenStreetMap' if url_base is None else None,
             min_zoom=7,
-            max_zoom=15
+            max_zoom=15,
+            prefer_canvas=True
         )
         
+        # Mapa base do cache local; o OpenStreetMap público só cobre os tiles que faltarem
+        if url_base is not None:
+            MapaBaseLocal(url_base, URL_OSM, ATRIBUICAO_OSM, name='OpenStreetMap',
+                          min_zoom=7, max_zoom=15).add_to(mapa)
+        
         # Cores para cada equipe
         cores_equipe = {
             'GEM': 'blue',
@@ -110,92 +127,122 @@ def criar_mapa_escolas():
         }
         
         # Adicionar marcadores das escolas
-        for idx, escola in df_escolas_clean.iterrows():
-            equipe = escola['EQUIPE_RESPONSAVEL']
-            cor = cores_equipe.get(equipe, 'gray')
+        if len(df_escolas_clean) > LIMITE_MARCADORES_INDIVIDUAIS:
+            # Muitas escolas: vetor único com agrupamento e popups montados no clique
+            adicionar_escolas_agrupadas(mapa, df_escolas_clean, cores_equipe)
+        else:
+            for idx, escola in df_escolas_clean.iterrows():
+                equipe = escola['EQUIPE_RESPONSAVEL']
+                cor = cores_equipe.get(equipe, 'gray')
             
-            # Criar popup informativo
-            popup_text = f"""
-            <b>{escola['ESCOLA']}</b><br>
-            <b>SRE:</b> {escola['SRE']}<br>
-            <b>Equipe:</b> {equipe}<br>
-            <b>IDEBES 2024:</b> {escola['IDEBES_2024']}<br>
-            <b>INEP:</b> {escola['INEP']}
-            """
+                # Criar popup informativo
+                popup_text = f"""
+                <b>{escola['ESCOLA']}</b><br>
+                <b>SRE:</b> {escola['SRE']}<br>
+                <b>Equipe:</b> {equipe}<br>
+                <b>IDEBES 2024:</b> {escola['IDEBES_2024']}<br>
+                <b>INEP:</b> {escola['INEP']}
+                """
             
-            # Adicionar marcador
-            folium.Marker(
-                location=[escola['LATITUDE'], escola['LONGITUDE']],
-                popup=folium.Popup(popup_text, max_width=300),
-                tooltip=escola['ESCOLA'],
-                icon=folium.Icon(color=cor, icon='info-sign')
-            ).add_to(mapa)
+                # Adicionar marcador
+                folium.Marker(
+                    location=[escola['LATITUDE'], escola['LONGITUDE']],
+                    popup=folium.Popup(popup_text, max_width=300),
+                    tooltip=escola['ESCOLA'],
+                    icon=folium.Icon(color=cor, icon='info-sign')
+                ).add_to(mapa)
         
+        # Municípios como tiles vetoriais: o navegador busca só os tiles da área visível
+        if url_municipios is not None:
+            CamadaMunicipiosVetoriais(url_municipios, CAMADA_MUNICIPIOS, cores_sre,
+                                      ZOOM_MAXIMO_TILES).add_to(mapa)
+            return mapa, df_escolas_clean, None
+
         # Adicionar municípios do ES com tooltips
         try:
-            gdf_municipios = gpd.read_file('mapa/BR_Municipios_2022.shp')
-            gdf_es = gdf_municipios[gdf_municipios['SIGLA_UF'] == 'ES']
+            # Relação município (código IBGE) -> SRE, calculada uma vez por versão dos dados
+            municipio_sre = carregar_municipio_sre('ES')
+
+            # Municípios do ES já simplificados para a faixa de zoom atual (cache entre sessões)
+            gdf_es = carregar_municipios_uf('ES', zoom=zoom)
             
-            # Função para normalizar nomes (remover acentos)
-            def normalizar_nome(nome):
-                return (nome.upper()
-                        .replace('Á', 'A').replace('À', 'A').replace('Â', 'A').replace('Ã', 'A')
-                        .replace('É', 'E').replace('Ê', 'E')
-                        .replace('Í', 'I')
-                        .replace('Ó', 'O').replace('Ô', 'O').replace('Õ', 'O')
-                        .replace('Ú', 'U')
-                        .replace('Ç', 'C')
-                        .strip())
+            # SRE, cor e texto do tooltip de cada município como propriedades das features
+            gdf_es = gdf_es.merge(municipio_sre[['CD_MUN', 'SRE']], on='CD_MUN', how='left')
+            gdf_es['SRE'] = gdf_es['SRE'].fillna("SRE não identificada")
+            gdf_es['COR'] = gdf_es['SRE'].str.upper().map(cores_sre).fillna('#95a5a6')
             
-            # Criar dicionário normalizado
-            municipio_para_sre_normalizado = {}
-            for municipio, sre in municipio_para_sre.items():
-                municipio_normalizado = normalizar_nome(municipio)
-                municipio_para_sre_normalizado[municipio_normalizado] = sre
+            # Tooltip no formato: "Vitória - SRE Carapina"
+            gdf_es['ROTULO'] = gdf_es['NM_MUN'] + ' - ' + gdf_es['SRE']
             
-            # Adicionar cada município individualmente com tooltip personalizado
-            for idx, municipio in gdf_es.iterrows():
-                municipio_nome = municipio['NM_MUN']
-                municipio_nome_normalizado = normalizar_nome(municipio_nome)
-                
-                # Buscar SRE no dicionário normalizado
-                sre_encontrada = municipio_para_sre_normalizado.get(municipio_nome_normalizado, "SRE não identificada")
-                
-                # Determinar cor
-                cor = cores_sre.get(sre_encontrada, '#95a5a6')
-                
-                # Tooltip no formato: "Vitória - SRE Carapina"
-                tooltip_text = f"{municipio_nome} - {sre_encontrada}"
-                
-                # Criar GeoJson para o município
-                geojson = folium.GeoJson(
-                    municipio['geometry'],
-                    style_function=lambda feature, cor=cor: {
-                        'fillColor': cor,
-                        'color': '#2c3e50',
-                        'weight': 1.5,
-                        'fillOpacity': 0.7,
-                    }
-                )
-                
-                # Adicionar tooltip personalizado
-                geojson.add_child(folium.Tooltip(
-                    tooltip_text,
+            # Uma única camada (FeatureCollection) com estilo definido pelas propriedades
+            folium.GeoJson(
+                gdf_es[['NM_MUN', 'SRE', 'COR', 'ROTULO', 'geometry']],
+                name='Municípios',
+                style_function=lambda feature: {
+                    'fillColor': feature['properties']['COR'],
+                    'color': '#2c3e50',
+                    'weight': 1.5,
+                    'fillOpacity': 0.7,
+                },
+                tooltip=folium.GeoJsonTooltip(
+                    fields=['ROTULO'],
+                    labels=False,
                     style="background-color: #2c3e50; color: white; font-family: Arial; font-size: 12px; padding: 8px; border-radius: 4px;"
-                ))
-                
-                geojson.add_to(mapa)
+                )
+            ).add_to(mapa)
             
-            st.success("✅ Mapa com municípios coloridos por SRE criado com sucesso!")
+            erro_municipios = None
             
         except Exception as e:
-            st.warning(f"Shapefile dos municípios não encontrado: {e}")
+            erro_municipios = e
         
-        return mapa, df_escolas_clean
+        return mapa, df_escolas_clean, erro_municipios
         
     except Exception as e:
         st.error(f"Erro ao criar mapa: {e}")
-        return None, None
+        return None, None, None
+
+# --- Cache dos mapas já construídos ---
+def obter_cache_mapas():
+    """Cache LRU compartilhado entre as sessões com os mapas já renderizados (só os textos do
+    componente, imutáveis; o objeto folium não é compartilhado)"""
+    return obter_cache('mapas', max_entradas=8, ttl=3600)
+
+def impressao_digital_mapa(zoom, url_municipios=None, url_base=None):
+    """Chave do mapa: conteúdo das planilhas, do shapefile, o nível de simplificação
+    (com tiles vetoriais o mapa é o mesmo para qualquer zoom) e a origem do mapa base"""
+    from sedu.artefatos import hash_arquivo
+    from sedu.municipios import ARQUIVO_ATRIBUTOS, ARQUIVO_SHAPEFILE, nivel_para_zoom
+
+    def hash_ou_none(caminho):
+        # Arquivo ausente também é uma versão: o mapa sai sem a camada correspondente
+        try:
+            return hash_arquivo(caminho)
+        except OSError:
+            return None
+
+    return (
+        hash_ou_none('mapa/escolas_prioritárias.csv'),
+        hash_ou_none('mapa/regionais_sedu.csv'),
+        hash_ou_none(ARQUIVO_SHAPEFILE),
+        hash_ou_none(ARQUIVO_ATRIBUTOS),
+        url_municipios if url_municipios is not None else nivel_para_zoom(zoom),
+        url_base,
+    )
+
+def obter_mapa_escolas(zoom=8, url_municipios=None, url_base=None):
+    """Retorna o mapa renderizado do cache ou o constrói e renderiza uma única vez por versão dos dados"""
+    from sedu.componente_mapa import renderizar_mapa
+
+    def construir():
+        mapa, dados_escolas, erro_municipios = criar_mapa_escolas(zoom, url_municipios, url_base)
+        if mapa is None:
+            return None
+        return renderizar_mapa(mapa), dados_escolas, erro_municipios
+    
+    chave = impressao_digital_mapa(zoom, url_municipios, url_base)
+    entrada = obter_cache_mapas().obter_ou_calcular(chave, construir)
+    return entrada if entrada is not None else (None, None, None)
 
 # --- Seção: Página Inicial ---
 if selecao == "Página Inicial":
@@ -246,6 +293,10 @@ elif selecao == "Introdução":
 
 # --- Seção: Critérios de Seleção ---
 elif selecao == "Critérios de Seleção":
+    from sedu.indices import carregar_escolas_por_sre
+    from sedu.priorizacao import (CANDIDATAS_POR_SRE, CRITERIOS, PESOS_PADRAO, ReclassificacaoIncremental,
+                                  carregar_motor_prioridade)
+
     st.header("Critérios de Seleção das Escolas Prioritárias")
     
     st.write("""
@@ -276,8 +327,9 @@ elif selecao == "Critérios de Seleção":
             # --- FILTRO SRE ---
             st.subheader("Filtro por SRE")
         
-            # Obter lista única de SREs dos dados
-            sres_disponiveis = sorted(dados_escolas['SRE'].unique())
+            # Escolas já ordenadas por (SRE, ESCOLA), com a fatia de cada SRE e as opções do filtro
+            escolas_por_sre = carregar_escolas_por_sre()
+            sres_disponiveis = escolas_por_sre.grupos
         
             # Adicionar opção "TODAS AS SREs"
             sres_com_todas = ["TODAS AS SREs"] + sres_disponiveis
@@ -288,19 +340,17 @@ elif selecao == "Critérios de Seleção":
                 index=0
             )
 
+            # Filtrar = recortar a fatia da SRE (já em ordem alfabética por SRE e Escola)
             if sre_selecionada == "TODAS AS SREs":
                 st.info("Visualizando dados de todas as SREs")
-                dados_filtrados = dados_escolas
+                dados_filtrados = escolas_por_sre.linhas()
             else:
                 st.info(f"Filtrado por: {sre_selecionada}")
-                dados_filtrados = dados_escolas[dados_escolas["SRE"] == sre_selecionada]
-        
-            # Ordenar os dados por SRE e Escola (ordem alfabética)
-            dados_filtrados = dados_filtrados.sort_values(['SRE', 'ESCOLA'])
+                dados_filtrados = escolas_por_sre.linhas(sre_selecionada)
         
             # Mostrar resultados SEM o índice
             st.subheader(f"Escolas Prioritárias ({len(dados_filtrados)} encontradas)")
-            st.dataframe(dados_filtrados[['SRE', 'ESCOLA']], 
+            st.dataframe(dados_filtrados[['SRE', 'ESCOLA', 'INEP']], 
                         width='stretch', 
                         hide_index=True)  # Esta linha remove a coluna de números
         
@@ -308,7 +358,7 @@ elif selecao == "Critérios de Seleção":
             if len(dados_filtrados) > 0:
                 st.write(f"**Total de escolas:** {len(dados_filtrados)}")
                 if sre_selecionada == "TODAS AS SREs":
-                    st.write(f"**SREs representadas:** {len(dados_filtrados['SRE'].unique())}")
+                    st.write(f"**SREs representadas:** {len(sres_disponiveis)}")
         
         else:
             st.error("Colunas 'SRE' e 'ESCOLA' não encontradas no arquivo limpo.")
@@ -317,167 +367,187 @@ elif selecao == "Critérios de Seleção":
     else:
         st.error("Não foi possível carregar o arquivo 'planilhas/Escolas_Prioritarias_LIMPO.csv'")
 
+    # --- Pontuação pelos critérios ---
+    st.subheader("📐 Pontuação pelos Critérios")
+    motor = carregar_motor_prioridade()
+    if len(motor) == 0:
+        st.warning("Sem indicadores para pontuar as escolas.")
+    else:
+        if motor.indisponiveis:
+            st.caption("Critérios sem indicador disponível (fora da pontuação): "
+                       + ", ".join(CRITERIOS[nome].rotulo for nome in motor.indisponiveis))
+        # Pesos dos critérios (simulação): cada movimento recalcula só o critério alterado
+        st.markdown("**Pesos dos critérios**")
+        colunas_pesos = st.columns(len(motor.criterios))
+        pesos = {}
+        for coluna, nome in zip(colunas_pesos, motor.criterios):
+            with coluna:
+                pesos[nome] = st.slider(CRITERIOS[nome].rotulo, min_value=0.0, max_value=5.0,
+                                        value=PESOS_PADRAO[nome], step=0.5, key=f"peso_{nome}")
+
+        reclassificacao = st.session_state.get('reclassificacao')
+        if reclassificacao is None or reclassificacao.motor is not motor:
+            reclassificacao = ReclassificacaoIncremental(motor, pesos)
+            st.session_state['reclassificacao'] = reclassificacao
+        else:
+            reclassificacao.ajustar(pesos)
+
+        candidatas_por_sre = st.number_input("Candidatas por SRE:", min_value=1, max_value=len(motor),
+                                             value=min(CANDIDATAS_POR_SRE, len(motor)))
+        candidatas = reclassificacao.candidatas(int(candidatas_por_sre))
+        colunas_notas = [CRITERIOS[nome].rotulo for nome in motor.criterios] + ['PONTUAÇÃO']
+        st.dataframe(candidatas.style.format({coluna: '{:.1f}' for coluna in colunas_notas}),
+                     width='stretch', hide_index=True)
+
 
 # --- Seção: Gráficos ---
 elif selecao == "Gráficos":
+    import pandas as pd
+
+    from sedu.graficos import CONFIG_GRAFICO, carregar_figura_comparacao, figura_serie
+    from sedu.indicadores import carregar_agregados, indicadores_escola
+
     st.header("📊 Análise de Metas e IDEBES")
-    st.markdown("Série histórica de 2021 a 2024")
 
-    st.write("""
-    "**OBS**: Os gráficos a seguir se referem somente às 22 Escolas Prioritárias
-    assessoradas pela Gerência de Ensino Médio (GEM)
-    """)
-    
-    # Carregar dados de metas e IDEB
-    df = carregar_dados_metas_ideb()
-    
-    if df.empty:
+    # Séries por escola, pré-calculadas uma vez por versão da planilha
+    series = carregar_dados_metas_ideb()
+
+    if series is None or len(series) == 0:
         st.error("Não foi possível carregar os dados de metas e IDEB.")
     else:
+        st.markdown(f"Série histórica de {series.ano_minimo} a {series.ano_maximo}")
+
+        st.write("""
+        "**OBS**: Os gráficos a seguir se referem somente às 22 Escolas Prioritárias
+        assessoradas pela Gerência de Ensino Médio (GEM)
+        """)
+
         # Sidebar com filtros
         st.sidebar.header("Filtros - Metas e IDEB")
         
         # Filtro de SRE
-        sre_options = ['Todas'] + sorted(df['SRE'].unique().tolist())
+        sre_options = ['Todas'] + series.sres
         sre_selecionada = st.sidebar.selectbox(
             "Selecione a SRE:",
             options=sre_options,
             index=1 if len(sre_options) > 1 else 0
         )
+        sre_filtro = None if sre_selecionada == "Todas" else sre_selecionada
+
+        # Modo de visualização: uma escola ou todas as escolas da SRE lado a lado
+        modo_graficos = st.sidebar.radio(
+            "Visualização:",
+            ["Escola individual", "Comparar escolas da SRE"]
+        )
+        comparar = modo_graficos == "Comparar escolas da SRE"
         
-        # Filtro de Escola baseado na SRE selecionada
-        if sre_selecionada == "Todas":
-            escola_options = ['Todas'] + sorted(df['ESCOLA'].unique().tolist())
-        else:
-            escola_options = ['Todas'] + sorted(df[df['SRE'] == sre_selecionada]['ESCOLA'].unique().tolist())
+        # Filtro de Escola baseado na SRE selecionada (por INEP: há escolas homônimas em SREs diferentes)
+        escola_options = [None] + series.ineps_por_nome(sre_filtro)
         
-        escola_selecionada = st.sidebar.selectbox(
+        inep_selecionado = None if comparar else st.sidebar.selectbox(
             "Selecione a Escola:",
             options=escola_options,
-            index=1 if len(escola_options) > 1 else 0
+            index=1 if len(escola_options) > 1 else 0,
+            format_func=lambda codigo: "Todas" if codigo is None else series.rotulo(codigo)
         )
         
-        # Filtrar dados baseado nas seleções
-        if sre_selecionada == "Todas":
-            dados_filtrados = df.copy()
-        else:
-            dados_filtrados = df[df['SRE'] == sre_selecionada]
-        
-        if escola_selecionada != "Todas":
-            dados_filtrados = dados_filtrados[dados_filtrados['ESCOLA'] == escola_selecionada]
+        if comparar:
+            # Grade com todas as escolas numa única figura (em cache por SRE e versão dos dados)
+            ineps = series.ineps(sre_filtro)
+            st.subheader(f"🔎 Comparação - {sre_selecionada if sre_filtro else 'Todas as SREs'}")
+            st.plotly_chart(carregar_figura_comparacao(sre_filtro), config=CONFIG_GRAFICO)
+
+            # Resumo por escola, dos agregados mantidos pelo histórico a cada ano incluído
+            st.subheader("📋 Resumo por Escola")
+            agregados = carregar_agregados().reindex(ineps)
+            resumo = pd.DataFrame({
+                'ESCOLA': [series.por_inep[codigo].escola for codigo in ineps],
+                'SRE': [series.por_inep[codigo].sre for codigo in ineps],
+                'MÉDIA META': agregados['MEDIA_META'].to_numpy(),
+                'MÉDIA IDEBES': agregados['MEDIA_IDEBES'].to_numpy(),
+                'ATINGIU ÚLTIMO ANO': ['—' if series.por_inep[codigo].ano_avaliado is None
+                                       else '✅' if series.por_inep[codigo].atingiu_ultimo_ano else '❌'
+                                       for codigo in ineps],
+            })
+            st.dataframe(
+                resumo.style.format({'MÉDIA META': '{:.2f}', 'MÉDIA IDEBES': '{:.2f}'}, na_rep='—'),
+                width='stretch', hide_index=True
+            )
         else:
-            # Se "Todas" escolas, pegar a primeira da SRE para exemplo
-            if sre_selecionada != "Todas" and not dados_filtrados.empty:
-                escola_padrao = dados_filtrados['ESCOLA'].iloc[0]
-                dados_filtrados = dados_filtrados[dados_filtrados['ESCOLA'] == escola_padrao]
-                escola_selecionada = escola_padrao
+            # Série da escola selecionada; com "Todas", a primeira escola da SRE serve de exemplo
+            if inep_selecionado is not None:
+                serie = series.serie(inep_selecionado)
+            else:
+                ineps = series.ineps(sre_filtro)
+                serie = series.por_inep[ineps[0]] if ineps else None
         
-        # Verificar se temos dados
-        if not dados_filtrados.empty:
-            # Ordenar por ano
-            dados_filtrados = dados_filtrados.sort_values('ANO')
-            
-            # Criar gráfico Plotly
-            fig = go.Figure()
-            
-            # Adicionar linha da META (vermelho)
-            fig.add_trace(go.Scatter(
-                x=dados_filtrados['ANO'],
-                y=dados_filtrados['META'],
-                mode='lines+markers+text',
-                name='META',
-                line=dict(color='red', width=4),
-                marker=dict(size=12, color='red'),
-                text=[f'{x:.2f}' for x in dados_filtrados['META']],
-                textposition='top center',
-                textfont=dict(size=12, color='red')
-            ))
-            
-            # Adicionar linha do IDEBES (azul)
-            fig.add_trace(go.Scatter(
-                x=dados_filtrados['ANO'],
-                y=dados_filtrados['IDEBES'],
-                mode='lines+markers+text',
-                name='IDEBES',
-                line=dict(color='blue', width=4),
-                marker=dict(size=12, color='blue'),
-                text=[f'{x:.2f}' for x in dados_filtrados['IDEBES']],
-                textposition='bottom center',
-                textfont=dict(size=12, color='blue')
-            ))
-            
-            # Layout do gráfico
-            fig.update_layout(
-                title=dict(
-                    text=f'{escola_selecionada}<br><sup>{sre_selecionada}</sup>',
-                    x=0.5,
-                    xanchor='center',
-                    font=dict(size=20)
-                ),
-                xaxis=dict(
-                    title='',
-                    tickmode='array',
-                    tickvals=[2021, 2022, 2023, 2024],
-                    ticktext=['2021', '2022', '2023', '2024'],
-                    gridcolor='lightgray',
-                    gridwidth=1
-                ),
-                yaxis=dict(
-                    title='Nota',
-                    range=[2.5, 6],
-                    gridcolor='lightgray',
-                    gridwidth=1,
-                    zeroline=False
-                ),
-                showlegend=True,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1
-                ),
-                height=500,
-                plot_bgcolor='white'
-            )
+            # Verificar se temos dados
+            if serie is not None:
+                anos = serie.anos.tolist()
+
+                # Figura da sessão: o modelo é montado uma vez e só os dados da escola são trocados
+                fig = figura_serie(st.session_state, serie)
             
-            # Mostrar gráfico no Streamlit
-            st.plotly_chart(fig, config={'displayModeBar': False, 'showlegend': True})
+                # Mostrar gráfico no Streamlit
+                st.plotly_chart(fig, config=CONFIG_GRAFICO)
             
-            # Mostrar tabela com os dados
-            st.subheader("📋 Dados Detalhados")
-            st.dataframe(
-                dados_filtrados[['ANO', 'META', 'IDEBES']].style.format({'META': '{:.2f}', 'IDEBES': '{:.2f}'}),
-                width='stretch'
-            )
+                # Mostrar tabela com os dados
+                st.subheader("📋 Dados Detalhados")
+                dados_escola = pd.DataFrame({'ANO': serie.anos, 'META': serie.meta, 'IDEBES': serie.idebes})
+                st.dataframe(
+                    dados_escola.style.format({'META': '{:.2f}', 'IDEBES': '{:.2f}'}, na_rep='—'),
+                    width='stretch'
+                )
             
-            # Estatísticas rápidas
-            col1, col2, col3 = st.columns(3)
+                # Estatísticas rápidas (pré-calculadas no armazém de séries)
+                col1, col2, col3 = st.columns(3)
             
-            with col1:
-                st.metric("Média da META", f"{dados_filtrados['META'].mean():.2f}")
+                with col1:
+                    st.metric("Média da META", "—" if pd.isna(serie.media_meta) else f"{serie.media_meta:.2f}")
             
-            with col2:
-                st.metric("Média do IDEBES", f"{dados_filtrados['IDEBES'].mean():.2f}")
+                with col2:
+                    st.metric("Média do IDEBES", "—" if pd.isna(serie.media_idebes) else f"{serie.media_idebes:.2f}")
             
-            with col3:
-                # Verificar desempenho no último ano
-                ultimo_ano = dados_filtrados.iloc[-1]
-                desempenho = "✅ Atingiu" if ultimo_ano['IDEBES'] >= ultimo_ano['META'] else "❌ Não Atingiu"
-                st.metric("Desempenho 2024", desempenho)
+                with col3:
+                    # Desempenho no último ano com META e IDEBES (não no último ano divulgado só com a META)
+                    if serie.ano_avaliado is None:
+                        st.metric("Desempenho", "—")
+                    else:
+                        desempenho = "✅ Atingiu" if serie.atingiu_ultimo_ano else "❌ Não Atingiu"
+                        st.metric(f"Desempenho {serie.ano_avaliado}", desempenho)
+
+                # Critérios de seleção calculados para o último ano da escola
+                indicadores = indicadores_escola(serie.inep)
+                if indicadores is not None:
+                    col4, col5 = st.columns(2)
+                    with col4:
+                        desafio = indicadores['DESAFIO_CRESCIMENTO']
+                        st.metric(f"Desafio de crescimento {anos[-1]}",
+                                  "—" if pd.isna(desafio) else f"{desafio:+.2f}",
+                                  help="META do ano menos o IDEBES do ano anterior")
+                    with col5:
+                        st.metric("Metas atingidas (últimos 3 anos)",
+                                  f"{indicadores['ATINGIMENTOS_3_ANOS']} de {indicadores['AVALIADOS_3_ANOS']}")
         
-        else:
-            st.warning("Nenhum dado encontrado para os filtros selecionados.")
+            else:
+                st.warning("Nenhum dado encontrado para os filtros selecionados.")
         
         # Informações gerais
         st.sidebar.markdown("---")
         st.sidebar.subheader("ℹ️ Informações - Metas e IDEB")
-        st.sidebar.write(f"**Total de escolas:** {df['ESCOLA'].nunique()}")
-        st.sidebar.write(f"**Total de SREs:** {df['SRE'].nunique()}")
-        st.sidebar.write(f"**Período:** {df['ANO'].min()} - {df['ANO'].max()}")
+        st.sidebar.write(f"**Total de escolas:** {len(series)}")
+        st.sidebar.write(f"**Total de SREs:** {len(series.sres)}")
+        st.sidebar.write(f"**Período:** {series.ano_minimo} - {series.ano_maximo}")
 
 # --- Seção: Mapas ---
 elif selecao == "Mapas":
+    from sedu.componente_mapa import exibir_mapa
+    from sedu.localizacao import escolas_com_pendencias
+    from sedu.mapa_base import url_mapa_base
+    from sedu.municipios import (artefatos_refeitos, carregar_municipio_sre, municipios_sem_correspondencia,
+                                 nivel_para_zoom)
+    from sedu.tiles_vetoriais import url_tiles_municipios
+
     st.header("🗺️ Mapa Interativo das Escolas Prioritárias")
     
     st.write("""
@@ -491,13 +561,55 @@ elif selecao == "Mapas":
     **💡 Dica:** Passe o mouse sobre os municípios para ver o nome e a SRE correspondente.
     """)
     
-    # Criar e exibir o mapa (sem cache)
+    # Zoom e centro da última interação (definem o nível de simplificação dos municípios)
+    zoom_atual = st.session_state.get('mapa_zoom', 8)
+    centro_atual = st.session_state.get('mapa_centro', (-20.0, -40.5))
+
+    # Tiles vetoriais dos municípios, se o MBTiles já tiver sido gerado (python -m sedu.tiles_vetoriais)
+    # e o servidor de tiles estiver configurado (SEDU_TILES_URL); senão, a camada GeoJSON
+    url_municipios = url_tiles_municipios()
+    # Mapa base do cache local, se já semeado (python -m sedu.mapa_base), no mesmo servidor
+    url_base = url_mapa_base()
+
+    # Criar (ou reaproveitar do cache) e exibir o mapa
     with st.spinner('Carregando mapa...'):
-        mapa, dados_escolas = criar_mapa_escolas()
+        mapa, dados_escolas, erro_municipios = obter_mapa_escolas(zoom_atual, url_municipios, url_base)
         
         if mapa is not None:
-            # Exibir o mapa no Streamlit
-            st_folium(mapa, width=800, height=600)
+            if erro_municipios is None:
+                st.success("✅ Mapa com municípios coloridos por SRE criado com sucesso!")
+            else:
+                st.warning(f"Shapefile dos municípios não encontrado: {erro_municipios}")
+            
+            # Artefatos desatualizados que o aplicativo teve de refazer (o pipeline não foi rodado)
+            refeitos = artefatos_refeitos()
+            if refeitos:
+                st.warning(f"Dados derivados desatualizados refeitos pelo aplicativo: {', '.join(sorted(refeitos))}. "
+                           "Rode `python -m sedu.pipeline` para gerá-los fora do aplicativo.")
+            
+            # Municípios sem SRE ou nomes da planilha de regionais sem município no IBGE
+            # (sem o shapefile, o aviso acima já explica a ausência dos municípios)
+            try:
+                sem_sre, sem_municipio = municipios_sem_correspondencia(carregar_municipio_sre('ES'))
+            except (OSError, ValueError):
+                sem_sre, sem_municipio = [], []
+            if sem_sre:
+                st.warning(f"Municípios sem SRE em 'regionais_sedu.csv': {', '.join(sem_sre)}")
+            if sem_municipio:
+                st.warning(f"Nomes em 'regionais_sedu.csv' sem município correspondente: {', '.join(sem_municipio)}")
+            
+            # Exibir o mapa no Streamlit (textos renderizados uma única vez, na construção)
+            retorno = exibir_mapa(mapa, largura=800, altura=600, zoom=zoom_atual, centro=centro_atual,
+                                  objetos_retornados=['zoom', 'center'])
+
+            # Ao mudar de faixa de zoom, recria o mapa com o nível de detalhe adequado
+            # (desnecessário com tiles vetoriais, que já vêm simplificados para cada zoom)
+            if url_municipios is None and retorno and retorno.get('zoom') is not None:
+                novo_zoom = retorno['zoom']
+                if nivel_para_zoom(novo_zoom) != nivel_para_zoom(zoom_atual):
+                    st.session_state['mapa_zoom'] = novo_zoom
+                    st.session_state['mapa_centro'] = (retorno['center']['lat'], retorno['center']['lng'])
+                    st.rerun()
             
             # Estatísticas abaixo do mapa
             if dados_escolas is not None:
@@ -519,6 +631,19 @@ elif selecao == "Mapas":
                     outras_count = len(dados_escolas[dados_escolas['EQUIPE_RESPONSAVEL'] != 'GEM'])
                     st.metric("Outras Equipes", outras_count)
                 
+                # Escolas cuja localização não confere com a planilha
+                if 'SRE_DIVERGENTE' in dados_escolas.columns:
+                    pendencias = escolas_com_pendencias(dados_escolas)
+                    if len(pendencias) > 0:
+                        st.warning(f"⚠️ {len(pendencias)} escola(s) com localização a revisar "
+                                   "(coordenada inválida, fora do ES ou em SRE diferente da declarada).")
+                        with st.expander("Ver escolas com localização a revisar"):
+                            st.dataframe(
+                                pendencias[['ESCOLA', 'SRE', 'LATITUDE', 'LONGITUDE', 'MUNICIPIO_PONTO', 'SRE_PONTO']],
+                                width='stretch',
+                                hide_index=True
+                            )
+                
                 # Tabela com dados das escolas
                 st.subheader("📋 Lista de Escolas no Mapa")
                 st.dataframe(
@@ -526,4 +651,13 @@ elif selecao == "Mapas":
                     width='stretch'
                 )
         else:
-            st.error("Não foi possível carregar o mapa. Verifique se os arquivos necessários estão na pasta.")
\ No newline at end of file
+            st.error("Não foi possível carregar o mapa. Verifique se os arquivos necessários estão na pasta.")
+
+# --- Barra lateral: uso dos caches compartilhados entre as sessões ---
+with st.sidebar.expander("⚙️ Cache de dados"):
+    for nome_cache, estatisticas in estatisticas_caches().items():
+        st.caption(f"**{nome_cache.split('.')[-1]}**: {estatisticas['acertos']} acertos, "
+                   f"{estatisticas['falhas']} falhas, {estatisticas['itens']}/{estatisticas['max_entradas']} itens")
+    pre_carregados = estatisticas_aquecimento()
+    if pre_carregados:
+        st.caption(f"**pré-carregamento**: {len(pre_carregados)} módulos em {sum(pre_carregados.values()):.1f}s")
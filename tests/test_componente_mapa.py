@@ -0,0 +1,57 @@
+"""Textos do mapa renderizado comparados com os que o st_folium envia ao componente."""
+import re
+
+import folium
+import pytest
+import streamlit_folium
+
+from sedu import componente_mapa
+
+# Identificadores aleatórios dos elementos folium (diferem entre dois mapas iguais)
+_ID_ALEATORIO = re.compile(r'_[0-9a-f]{32}')
+
+
+def _mapa():
+    mapa = folium.Map(location=[-20.0, -40.5], zoom_start=8, min_zoom=7, max_zoom=15, prefer_canvas=True)
+    folium.Marker([-20.3, -40.3], popup=folium.Popup('<b>Escola</b>', max_width=300), tooltip='Escola',
+                  icon=folium.Icon(color='blue', icon='info-sign')).add_to(mapa)
+    folium.GeoJson(
+        {'type': 'FeatureCollection', 'features': [{
+            'type': 'Feature', 'properties': {'ROTULO': 'Vitória - SRE Carapina'},
+            'geometry': {'type': 'Polygon', 'coordinates': [[[-40.4, -20.4], [-40.2, -20.4], [-40.2, -20.2],
+                                                             [-40.4, -20.4]]]},
+        }]},
+        style_function=lambda feature: {'color': '#2c3e50'},
+        tooltip=folium.GeoJsonTooltip(fields=['ROTULO'], labels=False),
+    ).add_to(mapa)
+    return mapa
+
+
+@pytest.fixture
+def chamadas(monkeypatch):
+    """Argumentos recebidos pelo componente, em vez de exibi-lo"""
+    registro = []
+
+    def componente(**argumentos):
+        registro.append(argumentos)
+        return argumentos['default']
+
+    monkeypatch.setattr(streamlit_folium, '_component_func', componente)
+    monkeypatch.setattr(componente_mapa, '_component_func', componente)
+    return registro
+
+
+@pytest.mark.parametrize('objetos_retornados', [None, ['zoom', 'center']])
+def test_argumentos_iguais_aos_do_st_folium(chamadas, objetos_retornados):
+    streamlit_folium.st_folium(_mapa(), width=800, height=600, zoom=8, center=(-20.0, -40.5),
+                               returned_objects=objetos_retornados)
+    componente_mapa.exibir_mapa(componente_mapa.renderizar_mapa(_mapa()), largura=800, altura=600, zoom=8,
+                                centro=(-20.0, -40.5), objetos_retornados=objetos_retornados)
+    esperado, obtido = chamadas
+
+    # O retorno de chamada do st_folium só repassa o estado com `key`, que o aplicativo não usa
+    assert set(obtido) == set(esperado)
+    for nome in set(esperado) - {'on_change', 'script', 'header', 'html'}:
+        assert obtido[nome] == esperado[nome], nome
+    for nome in ('script', 'header', 'html'):
+        assert _ID_ALEATORIO.sub('_id', obtido[nome]) == _ID_ALEATORIO.sub('_id', esperado[nome]), nome
@@ -0,0 +1,102 @@
+"""Inclusão de uma divulgação no histórico de META e IDEBES."""
+import threading
+
+import pandas as pd
+import pytest
+
+from sedu import armazem, historico
+
+
+@pytest.fixture
+def dados_derivados_vazio(tmp_path, monkeypatch):
+    """Histórico e armazém numa pasta vazia, como num checkout novo"""
+    pasta = tmp_path / 'idebes'
+    monkeypatch.setattr(armazem, 'PASTA_TABELAS', tmp_path / 'tabelas')
+    monkeypatch.setattr(historico, 'PASTA_HISTORICO', pasta)
+    monkeypatch.setattr(historico, 'ARQUIVO_CATALOGO', pasta / 'catalogo.json')
+    monkeypatch.setattr(historico, 'ARQUIVO_AGREGADOS', pasta / 'agregados.parquet')
+    return tmp_path
+
+
+def _divulgacao(pasta, ano):
+    """Planilha de um ano novo a partir do último ano da planilha base"""
+    base = armazem.ler_tabela('metas_idebes')
+    linhas = base[base['ANO'] == base['ANO'].max()].copy()
+    linhas['ANO'] = ano
+    linhas['META'] = (linhas['META'] + 0.1).round(2)
+    linhas['IDEBES'] = (linhas['IDEBES'] + 0.2).round(2)
+    caminho = pasta / f'idebes {ano}.csv'
+    linhas.to_csv(caminho, sep=';', decimal=',', index=False)
+    return caminho
+
+
+def _incluir_com_limite(caminho, limite=60):
+    resultado = {}
+
+    def incluir():
+        try:
+            resultado['ano'] = historico.incluir_divulgacao(caminho)
+        except Exception as erro:
+            resultado['erro'] = erro
+
+    thread = threading.Thread(target=incluir, daemon=True)
+    thread.start()
+    thread.join(limite)
+    assert not thread.is_alive(), "incluir_divulgacao travou"
+    if 'erro' in resultado:
+        raise resultado['erro']
+    return resultado['ano']
+
+
+def _conferir_reconstrucao():
+    """Indicadores e agregados incrementais iguais aos de uma reconstrução completa"""
+    incremental = historico.ler_indicadores_historico().sort_values(['ANO', 'INEP'], ignore_index=True)
+    agregados = historico.ler_agregados().sort_values('INEP', ignore_index=True)
+
+    # Reconstrução completa a partir das partições (as divulgações avulsas são mantidas)
+    historico.semear_historico()
+    pd.testing.assert_frame_equal(
+        incremental, historico.ler_indicadores_historico().sort_values(['ANO', 'INEP'], ignore_index=True))
+    pd.testing.assert_frame_equal(agregados, historico.ler_agregados().sort_values('INEP', ignore_index=True))
+
+
+def test_incluir_em_dados_derivados_vazio_igual_a_reconstrucao(dados_derivados_vazio):
+    caminho = _divulgacao(dados_derivados_vazio, 2025)
+
+    assert _incluir_com_limite(caminho) == 2025
+    assert 2025 in historico.anos_disponiveis()
+    _conferir_reconstrucao()
+
+
+def test_inclusao_que_falha_nao_deixa_ano_fora_do_catalogo(dados_derivados_vazio, monkeypatch):
+    historico.garantir_historico()
+    catalogo = historico.ler_catalogo()
+    gravar = pd.DataFrame.to_parquet
+
+    def falhar_nos_agregados(df, destino, *argumentos, **opcoes):
+        if destino.name.startswith(historico.ARQUIVO_AGREGADOS.name):
+            raise OSError('disco cheio')
+        return gravar(df, destino, *argumentos, **opcoes)
+
+    with monkeypatch.context() as contexto:
+        contexto.setattr(pd.DataFrame, 'to_parquet', falhar_nos_agregados)
+        with pytest.raises(OSError, match='disco cheio'):
+            historico.incluir_divulgacao(_divulgacao(dados_derivados_vazio, 2025))
+
+    assert historico.ler_catalogo() == catalogo
+    assert not historico.caminho_particao(2025).exists()
+    assert not list(historico.PASTA_HISTORICO.glob('*.tmp'))
+
+    # O ano seguinte não conta o ano que falhou na janela de 3 anos
+    historico.incluir_divulgacao(_divulgacao(dados_derivados_vazio, 2026))
+    assert 2025 not in historico.anos_disponiveis()
+    _conferir_reconstrucao()
+
+
+def test_ano_repetido_exige_substituir(dados_derivados_vazio):
+    caminho = _divulgacao(dados_derivados_vazio, 2025)
+    _incluir_com_limite(caminho)
+
+    with pytest.raises(ValueError, match='já está no histórico'):
+        historico.incluir_divulgacao(caminho)
+    assert historico.incluir_divulgacao(caminho, substituir=True) == 2025
@@ -0,0 +1,73 @@
+"""Leitura parcial de shapefiles comparada com a leitura completa do geopandas."""
+import geopandas as gpd
+import pytest
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
+
+from sedu.leitor_shapefile import ler_shapefile_filtrado
+
+BBOX = (-42.0, -22.0, -39.0, -17.0)
+
+
+def _quadrado(x, y, lado):
+    return [(x, y), (x + lado, y), (x + lado, y + lado), (x, y + lado), (x, y)]
+
+
+def _gravar_shapefile(pasta, tres_dimensoes=False):
+    geometrias = [
+        # Polígono com buraco
+        Polygon(_quadrado(-41.0, -21.0, 1.0), [_quadrado(-40.8, -20.8, 0.3)]),
+        # Multipolígono: duas partes, uma delas com buraco
+        MultiPolygon([Polygon(_quadrado(-40.0, -20.0, 0.5)),
+                      Polygon(_quadrado(-39.4, -19.0, 0.3), [_quadrado(-39.35, -18.95, 0.1)])]),
+        # Da UF procurada, mas fora do retângulo
+        Polygon(_quadrado(-35.0, -8.0, 0.5)),
+        # De outra UF
+        Polygon(_quadrado(-41.5, -19.5, 0.2)),
+    ]
+    if tres_dimensoes:
+        geometrias = [shapely.force_3d(geometria, 10.0) for geometria in geometrias]
+    caminho = pasta / 'municipios.shp'
+    gpd.GeoDataFrame({
+        'CD_MUN': ['3200102', '3200201', '3200300', '3100104'],
+        'NM_MUN': ['Afonso Cláudio', 'Água Doce do Norte', 'Fora do Retângulo', 'Outra UF'],
+        'SIGLA_UF': ['ES', 'ES', 'ES', 'MG'],
+        'AREA_KM2': [954.66, 473.73, 100.0, 50.5],
+    }, geometry=geometrias, crs='EPSG:4674').to_file(caminho, encoding='utf-8')
+    return caminho
+
+
+@pytest.mark.parametrize('tres_dimensoes', [False, True], ids=['Polygon', 'PolygonZ'])
+def test_igual_a_leitura_completa(tmp_path, tres_dimensoes):
+    caminho = _gravar_shapefile(tmp_path, tres_dimensoes)
+
+    lido = ler_shapefile_filtrado(caminho, 'SIGLA_UF', ['ES'], bbox=BBOX)
+
+    esperado = gpd.read_file(caminho)
+    esperado = esperado[(esperado['SIGLA_UF'] == 'ES') & esperado.intersects(shapely.box(*BBOX))]
+    assert lido['NM_MUN'].tolist() == esperado['NM_MUN'].tolist() == ['Afonso Cláudio', 'Água Doce do Norte']
+    assert lido['CD_MUN'].tolist() == esperado['CD_MUN'].tolist()
+    assert lido['AREA_KM2'].tolist() == pytest.approx(esperado['AREA_KM2'].tolist())
+    assert lido.crs.equals(esperado.crs, ignore_axis_order=True)
+    for obtida, referencia in zip(lido.geometry, shapely.force_2d(esperado.geometry.to_numpy())):
+        assert obtida.geom_type == referencia.geom_type
+        assert shapely.normalize(obtida).equals_exact(shapely.normalize(referencia), 1e-12)
+    assert len(lido.geometry.iloc[0].interiors) == 1
+    assert len(lido.geometry.iloc[1].geoms[1].interiors) == 1
+
+
+def test_ponteiro_git_lfs_gera_erro_claro(tmp_path):
+    caminho = _gravar_shapefile(tmp_path)
+    caminho.write_text("version https://git-lfs.github.com/spec/v1\noid sha256:0\nsize 271092304\n")
+
+    with pytest.raises(ValueError, match='ponteiro do Git LFS'):
+        ler_shapefile_filtrado(caminho, 'SIGLA_UF', ['ES'])
+
+
+def test_arquivo_truncado_gera_erro_claro(tmp_path):
+    caminho = _gravar_shapefile(tmp_path)
+    conteudo = caminho.read_bytes()
+    caminho.write_bytes(conteudo[:len(conteudo) // 2])
+
+    with pytest.raises(ValueError, match='incompleto'):
+        ler_shapefile_filtrado(caminho, 'SIGLA_UF', ['ES'])